@@ -0,0 +1,302 @@
+"""
+CPU-bound audio stages for the XTune TTS server
+
+Kept free of import-time side effects so these functions can run in the
+server's process pool.
+"""
+
+import importlib.util
+import io
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from pydub import AudioSegment
+
+# NumPy is imported by the post-processing functions that use it: it is
+# optional (plain stitching works without it), and only audio workers need
+# it, so it stays out of the server's import time
+
+# Bitrate for re-encoded episodes, matching the 48 kbps mono MP3 edge-tts returns
+DECODE_STITCH_BITRATE = "48k"
+
+# Post-processing: edge audio quieter than this is silence, and trimmed
+# segments keep this much lead-in and tail around their speech
+TRIM_THRESHOLD_DBFS = -45.0
+TRIM_PAD_MS = 120
+# Equal-power crossfade at every segment boundary
+CROSSFADE_MS = 40
+# Per-voice loudness target, LUFS-style: mean square of 400 ms blocks with
+# the BS.1770 absolute (-70) and relative (-10) gates, but no K-weighting
+TARGET_LOUDNESS_DB = -16.0
+LOUDNESS_BLOCK_MS = 400
+PEAK_CEILING = 10 ** (-1 / 20)  # -1 dBFS
+
+# MPEG audio Layer III tables, indexed by the version bits of the frame header
+MP3_BITRATES_KBPS = {
+    3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],  # MPEG-1
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],      # MPEG-2
+    0: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],      # MPEG-2.5
+}
+MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+def parse_mp3_header(header: bytes):
+    """Decode a Layer III frame header into (version, sample_rate, channels, frame_length, samples)"""
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x3
+    layer = (header[1] >> 1) & 0x3
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    bitrate = MP3_BITRATES_KBPS[version][bitrate_index] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+    padding = (header[2] >> 1) & 0x1
+    channels = 1 if header[3] >> 6 == 3 else 2
+    samples = 1152 if version == 3 else 576
+    frame_length = (samples // 8) * bitrate // sample_rate + padding
+    return version, sample_rate, channels, frame_length, samples
+
+def scan_mp3_frames(data: bytes):
+    """Locate the audio frames of MP3 data without decoding it
+
+    Returns (codec params, [(offset, length), ...], sample count), or None if
+    the data isn't plain Layer III that can be concatenated frame by frame.
+    """
+    offset = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        offset = 10 + size + (10 if data[5] & 0x10 else 0)
+    end = len(data) - 128 if data[-128:-125] == b"TAG" else len(data)
+
+    params = None
+    spans = []
+    total_samples = 0
+    while offset + 4 <= end:
+        header = parse_mp3_header(data[offset:offset + 4])
+        if not header:
+            return None
+        version, sample_rate, channels, frame_length, samples = header
+        if params is None:
+            params = (version, sample_rate, channels)
+            # A leading Xing/Info/VBRI frame describes only this file; drop it
+            if any(tag in data[offset:offset + 64] for tag in (b"Xing", b"Info", b"VBRI")):
+                offset += frame_length
+                continue
+        elif (version, sample_rate, channels) != params:
+            return None
+        spans.append((offset, min(frame_length, end - offset)))
+        total_samples += samples
+        offset += frame_length
+
+    if params is None:
+        return None
+    return params, spans, total_samples
+
+def concat_mp3_frames(segments, output_path: Path) -> float:
+    """Concatenate MP3 segments frame by frame, returning duration or 0.0 if params differ
+
+    segments is iterated twice (scan, then copy) and only one segment is
+    needed in memory at a time, so it can read them from disk lazily.
+    """
+    scans = []
+    for data in segments:
+        scan = scan_mp3_frames(data)
+        if not scan or (scans and scan[0] != scans[0][0]):
+            return 0.0
+        scans.append(scan)
+    if not scans:
+        return 0.0
+
+    total_samples = 0
+    with open(output_path, "wb") as output:
+        for data, (_, spans, samples) in zip(segments, scans):
+            output.write(extract_mp3_frames(data, spans))
+            total_samples += samples
+    return total_samples / scans[0][0][1]
+
+def extract_mp3_frames(data: bytes, spans) -> bytes:
+    """Copy the given frame spans of MP3 data back to back"""
+    view = memoryview(data)
+    return b"".join(view[offset:offset + length] for offset, length in spans)
+
+def decode_stitch(segments, output_path: Path) -> float:
+    """Decode and re-encode segments, joining their PCM in a single pass"""
+    first = None
+    chunks = []
+    for data in segments:
+        segment = AudioSegment.from_file(io.BytesIO(data), format="mp3")
+        if first is None:
+            first = segment
+        else:
+            segment = (segment.set_frame_rate(first.frame_rate)
+                              .set_channels(first.channels)
+                              .set_sample_width(first.sample_width))
+        chunks.append(segment.raw_data)
+    if first is None:
+        return 0.0
+
+    combined_audio = AudioSegment(
+        data=b"".join(chunks),
+        sample_width=first.sample_width,
+        frame_rate=first.frame_rate,
+        channels=first.channels
+    )
+    combined_audio.export(output_path, format="mp3", bitrate=DECODE_STITCH_BITRATE)
+    return len(combined_audio) / 1000.0
+
+def encode_renditions(source_path: Path, renditions):
+    """Encode several renditions of an episode with one ffmpeg run
+
+    renditions is [(ffmpeg output args, output path), ...]; the source is
+    decoded once and fed to every encoder. Outputs are written to
+    <name>.<pid>.part paths and renamed into place only if ffmpeg succeeds.
+    An output path ending in .hls is a directory holding an HLS playlist
+    and segments.
+    """
+    command = [AudioSegment.converter, "-y", "-loglevel", "error", "-i", str(source_path)]
+    staged = []
+    for args, path in renditions:
+        partial = path.with_name(f"{path.name}.{os.getpid()}.part")
+        if path.suffix == ".hls":
+            partial.mkdir(exist_ok=True)
+            args = [*args, "-hls_segment_filename", str(partial / "%03d.ts")]
+            target = partial / "index.m3u8"
+        else:
+            target = partial
+        command += ["-map", "0:a", *args, str(target)]
+        staged.append((partial, path))
+
+    try:
+        subprocess.run(command, check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError):
+        for partial, _ in staged:
+            if partial.is_dir():
+                shutil.rmtree(partial, ignore_errors=True)
+            else:
+                partial.unlink(missing_ok=True)
+        raise
+
+    for partial, path in staged:
+        if path.is_dir():
+            shutil.rmtree(path)
+        os.replace(partial, path)
+
+def postprocess_available() -> bool:
+    """Whether NumPy and ffmpeg are there for postprocess_stitch"""
+    return (importlib.util.find_spec("numpy") is not None
+            and shutil.which(AudioSegment.converter) is not None)
+
+def decode_pcm(segments):
+    """Decode MP3 segments to float32 (samples, channels) arrays in the first one's format"""
+    import numpy as np
+
+    first = None
+    arrays = []
+    for data in segments:
+        segment = AudioSegment.from_file(io.BytesIO(data), format="mp3").set_sample_width(2)
+        if first is None:
+            first = segment
+        else:
+            segment = segment.set_frame_rate(first.frame_rate).set_channels(first.channels)
+        pcm = np.frombuffer(segment.raw_data, dtype=np.int16).reshape(-1, first.channels)
+        arrays.append(pcm.astype(np.float32) / 32768.0)
+    if first is None:
+        return [], 0, 0
+    return arrays, first.frame_rate, first.channels
+
+def window_power(pcm, window: int):
+    """Mean square of each full, non-overlapping window of `window` samples"""
+    import numpy as np
+
+    count = len(pcm) // window
+    frames = pcm[:count * window].reshape(count, window, pcm.shape[1])
+    return np.mean(frames ** 2, axis=(1, 2))
+
+def trim_silence(pcm, rate: int):
+    """Cut leading and trailing silence, keeping TRIM_PAD_MS around the speech"""
+    import numpy as np
+
+    window = max(rate // 100, 1)
+    loud = np.flatnonzero(window_power(pcm, window) > 10 ** (TRIM_THRESHOLD_DBFS / 10))
+    if loud.size == 0:
+        return pcm
+    pad = rate * TRIM_PAD_MS // 1000
+    return pcm[max(loud[0] * window - pad, 0):min((loud[-1] + 1) * window + pad, len(pcm))]
+
+def gated_loudness(powers):
+    """Loudness in dB of block mean squares after the absolute and relative gates"""
+    import numpy as np
+
+    powers = powers[powers > 10 ** (-70 / 10)]
+    if powers.size == 0:
+        return None
+    powers = powers[powers > np.mean(powers) * 10 ** (-10 / 10)]
+    return 10 * np.log10(np.mean(powers))
+
+def match_loudness(parts, voices, rate: int):
+    """Scale each voice's segments to TARGET_LOUDNESS_DB, keeping peaks under PEAK_CEILING"""
+    import numpy as np
+
+    window = rate * LOUDNESS_BLOCK_MS // 1000
+    for voice in set(voices):
+        members = [i for i, other in enumerate(voices) if other == voice and parts[i].size]
+        if not members:
+            continue
+        # Segments shorter than a block count as one block
+        powers = [window_power(parts[i], window) if len(parts[i]) >= window
+                  else np.array([np.mean(parts[i] ** 2)]) for i in members]
+        loudness = gated_loudness(np.concatenate(powers))
+        if loudness is None:
+            continue
+        gain = 10 ** ((TARGET_LOUDNESS_DB - loudness) / 20)
+        peak = max(float(np.max(np.abs(parts[i]))) for i in members)
+        if peak * gain > PEAK_CEILING:
+            gain = PEAK_CEILING / peak
+        for i in members:
+            parts[i] = parts[i] * np.float32(gain)
+    return parts
+
+def crossfade_join(parts, rate: int, channels: int):
+    """Concatenate segments with an equal-power crossfade at each boundary"""
+    import numpy as np
+
+    fade = rate * CROSSFADE_MS // 1000
+    overlaps = [0] + [min(fade, len(a), len(b)) for a, b in zip(parts, parts[1:])]
+    output = np.zeros((sum(len(pcm) for pcm in parts) - sum(overlaps), channels), dtype=np.float32)
+    position = 0
+    for pcm, overlap in zip(parts, overlaps):
+        start = position - overlap
+        if overlap:
+            # cos^2 + sin^2 = 1 keeps the combined power level through the fade
+            angle = np.linspace(0, np.pi / 2, overlap, dtype=np.float32)[:, None]
+            output[start:position] = output[start:position] * np.cos(angle) + pcm[:overlap] * np.sin(angle)
+        output[position:start + len(pcm)] = pcm[overlap:]
+        position = start + len(pcm)
+    return output
+
+def postprocess_stitch(segments, voices, output_path: Path) -> float:
+    """Stitch MP3 segments via PCM: trim silence, match loudness per voice, crossfade
+
+    voices[i] names the speaker of segments[i]. Every stage is a vectorized
+    NumPy operation over whole segments. Returns the duration in seconds.
+    """
+    import numpy as np
+
+    parts, rate, channels = decode_pcm(segments)
+    if not parts:
+        return 0.0
+    parts = [trim_silence(pcm, rate) for pcm in parts]
+    parts = match_loudness(parts, voices, rate)
+    pcm = crossfade_join(parts, rate, channels)
+
+    samples = (np.clip(pcm, -1.0, 1.0) * 32767).astype(np.int16)
+    AudioSegment(
+        data=samples.tobytes(),
+        sample_width=2,
+        frame_rate=rate,
+        channels=channels
+    ).export(output_path, format="mp3", bitrate=DECODE_STITCH_BITRATE)
+    return len(samples) / rate
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the XTune TTS server
+
+Runs load scenarios against the Flask app in-process with the fake TTS
+backend, so no network or edge-tts is needed. The coldstart scenario times
+a fresh server process from import to its first episode:
+
+    python benchmark.py --scenario all --episodes 12 --latency-ms 150
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+def make_script(lines: int) -> str:
+    """A unique Ant/Dawn script so neither episode dedup nor the TTS cache kicks in"""
+    tag = uuid.uuid4().hex[:8]
+    hosts = ["Dawn", "Ant"]
+    return "\n".join(
+        f"{hosts[i % 2]}: Line {i} of episode {tag}, reacting to today's top tweets."
+        for i in range(lines)
+    )
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is KB on Linux, bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class ResourceSampler:
+    """Tracks peak RSS and segment scratch usage (memory and spilled) while a scenario runs"""
+
+    def __init__(self, server, interval: float = 0.02):
+        self.server = server
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_scratch_memory = 0
+        self.peak_spill = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.peak_rss = max(self.peak_rss, current_rss_bytes())
+            scratch = dict(self.server.scratch_bytes)
+            self.peak_scratch_memory = max(self.peak_scratch_memory, scratch['memory'])
+            self.peak_spill = max(self.peak_spill, scratch['disk'])
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join()
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100.0 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+# Run in a fresh interpreter by run_cold_start; prints its timings as JSON
+COLD_START_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import simple_tts_server as server
+imported = time.perf_counter()
+server.create_app()
+serving = time.perf_counter()
+server.ready.wait()
+ready = time.perf_counter()
+server.generate_podcast_script = lambda tweets_text: tweets_text
+server.app.test_client().post("/generate-podcast", json={"text": sys.argv[1]})
+done = time.perf_counter()
+print("COLD_START " + json.dumps({
+    'import_s': imported - started,
+    'serving_s': serving - started,
+    'ready_s': ready - started,
+    'first_episode_s': done - ready,
+    'phases': server.startup_phases,
+}))
+server.shutdown()
+"""
+
+
+def run_cold_start(repo_dir: Path, script: str) -> dict:
+    """Time a new server process: import, serving, ready, and its first episode"""
+    print("\n⏱️  coldstart: fresh server process")
+    result = subprocess.run(
+        [sys.executable, "-c", COLD_START_PROBE, script],
+        cwd=tempfile.mkdtemp(prefix="xtune-cold-"),
+        env={**os.environ, "PYTHONPATH": str(repo_dir)},
+        capture_output=True, text=True, check=True,
+    )
+    line = next(line for line in result.stdout.splitlines() if line.startswith("COLD_START "))
+    timings = json.loads(line[len("COLD_START "):])
+    report = {'scenario': 'coldstart'}
+    report.update((key, round(value, 3)) for key, value in timings.items() if key != 'phases')
+    report.update((f"{phase}_phase_s", round(value, 3)) for phase, value in timings['phases'].items())
+    for key, value in report.items():
+        print(f"   {key}: {value}")
+    return report
+
+
+def run_scenario(server, name: str, scripts, concurrency: int) -> dict:
+    """POST every script to /generate-podcast with the given concurrency and measure it"""
+    client = server.app.test_client()
+
+    def generate(script):
+        start = time.perf_counter()
+        response = client.post("/generate-podcast", json={"text": script})
+        ok = response.status_code == 200 and response.get_json().get("success")
+        return time.perf_counter() - start, bool(ok)
+
+    print(f"\n⏱️  {name}: {len(scripts)} episodes, concurrency {concurrency}")
+    with ResourceSampler(server) as sampler:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(generate, scripts))
+        elapsed = time.perf_counter() - started
+
+    latencies = [latency for latency, ok in results if ok]
+    report = {
+        'scenario': name,
+        'episodes': len(scripts),
+        'succeeded': len(latencies),
+        'failed': len(results) - len(latencies),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_eps': round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        'p50_s': round(percentile(latencies, 50), 3),
+        'p95_s': round(percentile(latencies, 95), 3),
+        'p99_s': round(percentile(latencies, 99), 3),
+        'mean_s': round(statistics.mean(latencies), 3) if latencies else 0.0,
+        'peak_rss_mb': round(sampler.peak_rss / 2**20, 1),
+        'peak_scratch_memory_kb': round(sampler.peak_scratch_memory / 1024, 1),
+        'peak_spill_disk_kb': round(sampler.peak_spill / 1024, 1),
+    }
+    for key, value in report.items():
+        print(f"   {key}: {value}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline XTune TTS server benchmark")
+    parser.add_argument("--scenario", choices=["burst", "long", "duplicates", "coldstart", "all"], default="all")
+    parser.add_argument("--episodes", type=int, default=12, help="episodes per scenario")
+    parser.add_argument("--lines", type=int, default=20, help="script lines per burst episode")
+    parser.add_argument("--long-lines", type=int, default=150, help="script lines per long episode")
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="fake TTS latency per line")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fake TTS failure probability per call")
+    parser.add_argument("--spill-bytes", type=int,
+                        help="per-episode segment bytes kept in memory before spilling to disk")
+    parser.add_argument("--json", type=Path, help="also write the reports to this file")
+    args = parser.parse_args()
+
+    repo_dir = Path(__file__).resolve().parent
+    if args.json:
+        args.json = args.json.resolve()
+    workdir = tempfile.mkdtemp(prefix="xtune-bench-")
+    # The server keeps its output under ./audio_output; isolate it per run
+    os.chdir(workdir)
+    sys.path.insert(0, str(repo_dir))
+    os.environ["XTUNE_TTS_BACKENDS"] = "fake"
+    if args.spill_bytes is not None:
+        os.environ["XTUNE_SEGMENT_SPILL_BYTES"] = str(args.spill_bytes)
+    # Admission control would shed the bursts this benchmark sends on purpose
+    os.environ.setdefault("XTUNE_RATE_LIMIT_PER_MINUTE", "0")
+    os.environ.setdefault("XTUNE_MAX_QUEUED_JOBS", "100000")
+    # Everything runs in-process; no need for the job events port
+    os.environ.setdefault("XTUNE_EVENTS_PORT", "0")
+    import simple_tts_server as server
+
+    server.create_app()
+    server.ready.wait()
+    fake_tts = server.tts_router.backends[0]
+    fake_tts.latency_ms = args.latency_ms
+    fake_tts.jitter_ms = args.jitter_ms
+    fake_tts.failure_rate = args.failure_rate
+    # The input *is* the script, so scenarios control script length directly
+    server.generate_podcast_script = lambda tweets_text: tweets_text
+
+    print("🚀 XTune benchmark")
+    print(f"   workdir: {workdir}")
+    print(f"   fake TTS: {args.latency_ms}±{args.jitter_ms} ms, failure rate {args.failure_rate}")
+
+    scenarios = ["burst", "long", "duplicates", "coldstart"] if args.scenario == "all" else [args.scenario]
+    reports = []
+    for name in scenarios:
+        if name == "coldstart":
+            reports.append(run_cold_start(repo_dir, make_script(args.lines)))
+            continue
+        if name == "burst":
+            scripts = [make_script(args.lines) for _ in range(args.episodes)]
+        elif name == "long":
+            scripts = [make_script(args.long_lines) for _ in range(max(args.episodes // 4, 1))]
+        else:
+            scripts = [make_script(args.lines)] * args.episodes
+        reports.append(run_scenario(server, name, scripts, concurrency=len(scripts)))
+
+    print(f"\n📊 Fake TTS calls: {fake_tts.calls} ({fake_tts.failures} failed)")
+    if args.json:
+        args.json.write_text(json.dumps(reports, indent=2))
+        print(f"📁 Reports written to {args.json}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+SQLite index of generated episodes for the XTune TTS server
+
+Tracks size, duration, creation/access time and source hash of every
+episode in the output directory, enforces a byte quota and TTL with LRU
+eviction, and serves paginated listings without scanning the directory.
+An episode's size and eviction cover its renditions (episode_<hash>.*).
+Also keeps the scripts of incremental episodes' blocks, so unchanged
+blocks are re-used word for word, and which episode each publish slot
+currently serves.
+"""
+
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS episodes (
+    source_hash TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    script TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS episodes_last_accessed ON episodes (last_accessed);
+CREATE INDEX IF NOT EXISTS episodes_created_at ON episodes (created_at);
+CREATE TABLE IF NOT EXISTS blocks (
+    block_key TEXT PRIMARY KEY,
+    script TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS slots (
+    slot TEXT PRIMARY KEY,
+    source_hash TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# Access times closer together than this are not rewritten, so Range
+# requests during playback don't each cost a database write
+TOUCH_INTERVAL_SECONDS = 60
+
+
+def disk_usage(path: Path) -> int:
+    """Bytes used by a file, or by the files in a directory"""
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+    return path.stat().st_size
+
+
+class EpisodeStore:
+    """Index plus quota/TTL lifecycle for episode files in output_dir"""
+
+    def __init__(self, output_dir: Path, quota_bytes: int, ttl_seconds: int):
+        self.output_dir = output_dir
+        self.quota_bytes = quota_bytes
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(output_dir / "episodes.db", check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        with self.lock, self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.executescript(SCHEMA)
+
+    def adopt_untracked(self):
+        """Index episode files on disk that aren't in the index yet
+
+        These are episode_<uuid>.mp3 files from servers that predate the
+        index; they count towards the quota and are listed, without a
+        duration or script.
+        """
+        with self.lock:
+            known = {row[0] for row in self.db.execute("SELECT filename FROM episodes")}
+        now = time.time()
+        rows = []
+        for path in self.output_dir.glob("episode_*.mp3"):
+            # Renditions (episode_<hash>.<profile>.mp3) belong to their episode
+            if path.name in known or "." in path.stem:
+                continue
+            rows.append((path.stem[len("episode_"):], path.name, self.episode_size(path.name),
+                         0.0, "", path.stat().st_mtime, now))
+        if rows:
+            print(f"📇 Indexing {len(rows)} untracked episodes")
+            with self.lock, self.db:
+                self.db.executemany(
+                    "INSERT OR IGNORE INTO episodes VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+                )
+
+    def episode_files(self, filename: str):
+        """An episode's file plus any renditions of it, but not ones still being written"""
+        return [path for path in self.output_dir.glob(f"{Path(filename).stem}.*")
+                if path.suffix != ".part"]
+
+    def episode_size(self, filename: str) -> int:
+        total = 0
+        for path in self.episode_files(filename):
+            try:
+                total += disk_usage(path)
+            except OSError:
+                pass
+        return total
+
+    def add(self, source_hash: str, filename: str, duration: float, script: str):
+        """Record a finished episode, then evict down to the quota"""
+        now = time.time()
+        size = self.episode_size(filename)
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO episodes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (source_hash, filename, size, duration, script, now, now)
+            )
+        self.enforce()
+
+    def get(self, source_hash: str):
+        """Return the episode row for source_hash if its file still exists"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT * FROM episodes WHERE source_hash = ?", (source_hash,)
+            ).fetchone()
+        if row and not (self.output_dir / row['filename']).exists():
+            self.remove([row])
+            return None
+        return row
+
+    def touch(self, filename: str):
+        """Mark an episode as recently used for LRU eviction"""
+        now = time.time()
+        with self.lock, self.db:
+            self.db.execute(
+                "UPDATE episodes SET last_accessed = ? WHERE filename = ? AND last_accessed < ?",
+                (now, filename, now - TOUCH_INTERVAL_SECONDS)
+            )
+
+    def page(self, limit: int, offset: int):
+        """Newest-first page of episodes and the total count"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT filename, size, duration, created_at FROM episodes "
+                "ORDER BY created_at DESC LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+            total = self.db.execute("SELECT COUNT(*) FROM episodes").fetchone()[0]
+        return rows, total
+
+    def total_bytes(self) -> int:
+        with self.lock:
+            return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM episodes").fetchone()[0]
+
+    def get_block(self, block_key: str):
+        """Script of an incremental episode block, or None"""
+        with self.lock, self.db:
+            row = self.db.execute(
+                "SELECT script FROM blocks WHERE block_key = ?", (block_key,)
+            ).fetchone()
+            if row:
+                self.db.execute("UPDATE blocks SET last_used = ? WHERE block_key = ?",
+                                (time.time(), block_key))
+        return row['script'] if row else None
+
+    def put_block(self, block_key: str, script: str):
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO blocks VALUES (?, ?, ?)",
+                            (block_key, script, time.time()))
+
+    def set_slot(self, slot: str, source_hash: str):
+        """Point a publish slot at a finished episode"""
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO slots VALUES (?, ?, ?)",
+                            (slot, source_hash, time.time()))
+
+    def get_slot(self, slot: str):
+        """Source hash of the episode a publish slot serves, or None"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT source_hash FROM slots WHERE slot = ?", (slot,)
+            ).fetchone()
+        return row['source_hash'] if row else None
+
+    def enforce(self):
+        """Evict expired episodes and blocks, then least recently used episodes over the quota"""
+        with self.lock:
+            expired = []
+            if self.ttl_seconds > 0:
+                with self.db:
+                    self.db.execute("DELETE FROM blocks WHERE last_used < ?",
+                                    (time.time() - self.ttl_seconds,))
+                expired = self.db.execute(
+                    "SELECT * FROM episodes WHERE created_at < ?",
+                    (time.time() - self.ttl_seconds,)
+                ).fetchall()
+
+            over_quota = []
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM episodes").fetchone()[0]
+            total -= sum(row['size'] for row in expired)
+            if total > self.quota_bytes:
+                expired_hashes = {row['source_hash'] for row in expired}
+                for row in self.db.execute("SELECT * FROM episodes ORDER BY last_accessed"):
+                    if total <= self.quota_bytes:
+                        break
+                    if row['source_hash'] in expired_hashes:
+                        continue
+                    over_quota.append(row)
+                    total -= row['size']
+
+        if expired or over_quota:
+            print(f"🧹 Evicting {len(expired)} expired and {len(over_quota)} over-quota episodes")
+            self.remove(expired + over_quota)
+
+    def remove(self, rows):
+        """Delete episodes' files and index entries"""
+        for row in rows:
+            for path in self.episode_files(row['filename']):
+                if path.is_dir():
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    path.unlink(missing_ok=True)
+        with self.lock, self.db:
+            self.db.executemany(
+                "DELETE FROM episodes WHERE source_hash = ?",
+                [(row['source_hash'],) for row in rows]
+            )
@@ -0,0 +1,37 @@
+"""
+Production gunicorn settings for the XTune TTS server
+
+    gunicorn -c gunicorn.conf.py 'simple_tts_server:create_app()'
+
+Each worker starts serving once create_app's core phase is done; point
+the load balancer's readiness check at /ready, which turns 200 once the
+worker has warmed its TTS backends.
+"""
+
+import os
+
+bind = os.environ.get("XTUNE_BIND", "0.0.0.0:5001")
+
+# One worker: running several is not supported yet. Job records and
+# in-flight dedup live in the process that accepted the request, so with
+# more workers /status/<job_id>, /stream/<job_id> and /slots answer 404 on
+# the others, and identical requests landing on different workers are
+# each built. Job events (XTUNE_EVENTS_PORT) would only be served by the
+# worker that binds the port first. Only the job journal is shared.
+# Threads cover concurrent clients; episodes run on the job worker pool.
+workers = int(os.environ.get("XTUNE_WEB_WORKERS", "1"))
+worker_class = "gthread"
+threads = int(os.environ.get("XTUNE_WEB_THREADS", "16"))
+
+# Synchronous /generate-podcast requests wait for their episode
+timeout = 300
+# On SIGTERM, give in-flight requests and running jobs time to finish;
+# queued jobs stay journaled and resume on restart
+graceful_timeout = 300
+keepalive = 5
+
+
+def worker_exit(server, worker):
+    """Drain in-flight generation jobs before the worker process exits"""
+    from simple_tts_server import shutdown
+    shutdown()
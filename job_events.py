@@ -0,0 +1,164 @@
+"""
+Server-sent job events and webhooks for the XTune TTS server
+
+EventHub lives on the server's asyncio loop. Each SSE listener is an
+asyncio.Queue drained by an aiohttp handler, so an open stream costs a
+queue rather than a web worker thread, and webhooks are POSTed from the
+same loop. Topics are job ids plus "slot:<slot>" for publish slots; a
+new listener gets the topic's latest event first, so it never has to
+poll for the current state.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+
+# Events are snapshots, so a slow listener only needs the latest few
+LISTENER_QUEUE_SIZE = 16
+# Comment lines sent on idle streams so proxies don't time them out
+KEEPALIVE_SECONDS = 15
+# A job's stream ends after one of these; slot streams stay open
+TERMINAL_EVENTS = ('done', 'failed')
+WEBHOOK_ATTEMPTS = 3
+WEBHOOK_TIMEOUT_SECONDS = 10
+
+
+def format_event(name: str, data: dict) -> bytes:
+    """One server-sent event frame"""
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+class EventHub:
+    """Fans job events out to SSE listeners and webhooks
+
+    Every method runs on the hub's event loop; other threads publish with
+    loop.call_soon_threadsafe. Webhook bodies are signed with HMAC-SHA256
+    in X-XTune-Signature when a secret is configured.
+    """
+
+    def __init__(self, webhook_urls=(), webhook_events=TERMINAL_EVENTS,
+                 webhook_secret: str = None, static_topics=()):
+        self.webhook_urls = list(webhook_urls)
+        self.webhook_events = set(webhook_events)
+        self.webhook_secret = webhook_secret
+        # Topics that may be listened to before their first event
+        self.static_topics = set(static_topics)
+        self.listeners = {}  # topic -> set of queues
+        self.latest = {}     # topic -> latest (name, data)
+        self.webhook_tasks = set()
+        self.runner = None
+        self.session = None
+        self.stats = {'published': 0, 'webhooks_sent': 0, 'webhooks_failed': 0}
+
+    def listener_count(self) -> int:
+        return sum(len(queues) for queues in list(self.listeners.values()))
+
+    def publish(self, topics, name: str, data: dict):
+        """Send an event to every listener of these topics, and to the webhooks"""
+        self.stats['published'] += 1
+        for topic in topics:
+            self.latest[topic] = (name, data)
+            for queue in self.listeners.get(topic, ()):
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait((name, data))
+        if name in self.webhook_events:
+            for url in self.webhook_urls:
+                task = asyncio.ensure_future(self.send_webhook(url, name, data))
+                self.webhook_tasks.add(task)
+                task.add_done_callback(self.webhook_tasks.discard)
+
+    def forget(self, topic: str):
+        """Drop a finished job's latest event; later listeners get a 404"""
+        self.latest.pop(topic, None)
+
+    async def send_webhook(self, url: str, name: str, data: dict):
+        """POST an event to a webhook, retrying with backoff"""
+        import aiohttp
+
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=WEBHOOK_TIMEOUT_SECONDS))
+        body = json.dumps({'event': name, **data}).encode("utf-8")
+        headers = {'Content-Type': 'application/json'}
+        if self.webhook_secret:
+            signature = hmac.new(self.webhook_secret.encode("utf-8"), body, hashlib.sha256)
+            headers['X-XTune-Signature'] = f"sha256={signature.hexdigest()}"
+
+        for attempt in range(1, WEBHOOK_ATTEMPTS + 1):
+            try:
+                async with self.session.post(url, data=body, headers=headers) as response:
+                    if response.status < 300:
+                        self.stats['webhooks_sent'] += 1
+                        return
+                    error = f"HTTP {response.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+            if attempt < WEBHOOK_ATTEMPTS:
+                await asyncio.sleep(2 ** attempt)
+        self.stats['webhooks_failed'] += 1
+        print(f"⚠️  Webhook {name} to {url} failed: {error}")
+
+    async def stream(self, request):
+        """aiohttp handler: stream a job's or slot's events as text/event-stream"""
+        from aiohttp import web
+
+        if 'slot' in request.match_info:
+            topic = f"slot:{request.match_info['slot']}"
+        else:
+            topic = request.match_info['job_id']
+        if topic not in self.latest and topic not in self.static_topics:
+            raise web.HTTPNotFound(text="Unknown job or slot")
+
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            # Stop nginx buffering the stream
+            'X-Accel-Buffering': 'no',
+        })
+        await response.prepare(request)
+        queue = asyncio.Queue(LISTENER_QUEUE_SIZE)
+        if topic in self.latest:
+            queue.put_nowait(self.latest[topic])
+        listeners = self.listeners.setdefault(topic, set())
+        listeners.add(queue)
+        try:
+            while True:
+                try:
+                    name, data = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    await response.write(b": keepalive\n\n")
+                    continue
+                await response.write(format_event(name, data))
+                if name in TERMINAL_EVENTS and topic not in self.static_topics:
+                    break
+        except ConnectionResetError:
+            pass
+        finally:
+            listeners.discard(queue)
+            if not listeners and self.listeners.get(topic) is listeners:
+                del self.listeners[topic]
+        return response
+
+    async def start(self, host: str, port: int):
+        """Serve /events/<job_id> and /events/slots/<slot> on host:port"""
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/events/slots/{slot}", self.stream)
+        app.router.add_get("/events/{job_id}", self.stream)
+        self.runner = web.AppRunner(app, access_log=None, handle_signals=False)
+        await self.runner.setup()
+        try:
+            await web.TCPSite(self.runner, host, port).start()
+        except OSError:
+            await self.runner.cleanup()
+            self.runner = None
+            raise
+
+    async def close(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+        if self.session is not None:
+            await self.session.close()
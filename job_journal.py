@@ -0,0 +1,137 @@
+"""
+Durable journal of unfinished generation jobs for the XTune TTS server
+
+Records each queued job's input, its generated script and every
+completed segment's checksum, so a restarted server can pick the job up
+where it stopped instead of paying for the script and TTS again. Rows are
+deleted once a job finishes, so the journal only ever holds work in flight.
+
+Each server process owns its jobs through a lock file it holds for its
+whole life; once the lock can be taken, the owner is gone and its jobs
+are up for grabs. Unlike pids, these never get reused by a restart.
+"""
+
+import fcntl
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    episode_key TEXT NOT NULL,
+    tweets_text TEXT NOT NULL,
+    incremental INTEGER NOT NULL,
+    lane TEXT NOT NULL,
+    script TEXT,
+    owner TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    cache_key TEXT NOT NULL,
+    checksum TEXT NOT NULL,
+    audio BLOB,
+    PRIMARY KEY (job_id, idx)
+);
+"""
+
+
+class JobJournal:
+    """SQLite journal of in-flight jobs, shared by the server's worker processes"""
+
+    def __init__(self, path: Path):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        with self.lock, self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.executescript(SCHEMA)
+        self.owners_dir = path.parent / "job_owners"
+        self.owners_dir.mkdir(exist_ok=True)
+        self.owner = uuid.uuid4().hex
+        self.owner_file = open(self.owners_dir / f"{self.owner}.lock", "w")
+        fcntl.flock(self.owner_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def owner_alive(self, owner: str) -> bool:
+        """Whether the process that owns `owner` still holds its lock"""
+        if owner == self.owner:
+            return True
+        path = self.owners_dir / f"{owner}.lock"
+        try:
+            with open(path, "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+        path.unlink(missing_ok=True)
+        return False
+
+    def add(self, job_id: str, episode_key: str, tweets_text: str, incremental: bool,
+            lane: str, created_at: float):
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, NULL, ?, ?)",
+                (job_id, episode_key, tweets_text, int(incremental), lane, self.owner, created_at)
+            )
+
+    def set_script(self, job_id: str, script: str):
+        with self.lock, self.db:
+            self.db.execute("UPDATE jobs SET script = ? WHERE job_id = ?", (script, job_id))
+
+    def script(self, job_id: str):
+        """The script recorded for a job, or None if it hadn't got that far"""
+        with self.lock:
+            row = self.db.execute("SELECT script FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row['script'] if row else None
+
+    def add_segment(self, job_id: str, index: int, cache_key: str, checksum: str, audio: bytes = None):
+        """Checkpoint a finished segment; audio is only kept if it isn't in the TTS cache"""
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?, ?)",
+                (job_id, index, cache_key, checksum, audio)
+            )
+
+    def segments(self, job_id: str) -> dict:
+        """Checkpointed segments of a job by index"""
+        with self.lock:
+            rows = self.db.execute("SELECT * FROM segments WHERE job_id = ?", (job_id,)).fetchall()
+        return {row['idx']: row for row in rows}
+
+    def claim_orphans(self) -> list:
+        """Take over jobs whose owning process is gone, oldest first
+
+        The owner is swapped with a compare-and-set, so two restarting
+        workers never resume the same job.
+        """
+        with self.lock:
+            rows = self.db.execute("SELECT * FROM jobs ORDER BY created_at").fetchall()
+        claimed = []
+        for row in rows:
+            if self.owner_alive(row['owner']):
+                continue
+            with self.lock, self.db:
+                updated = self.db.execute(
+                    "UPDATE jobs SET owner = ? WHERE job_id = ? AND owner = ?",
+                    (self.owner, row['job_id'], row['owner'])
+                ).rowcount
+            if updated:
+                claimed.append(row)
+        return claimed
+
+    def finish(self, job_id: str):
+        """Forget a job that completed or failed"""
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM segments WHERE job_id = ?", (job_id,))
+            self.db.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def close(self):
+        """Give up ownership; jobs still journaled are resumed by the next server"""
+        self.owner_file.close()
+        (self.owners_dir / f"{self.owner}.lock").unlink(missing_ok=True)
+        with self.lock:
+            self.db.close()
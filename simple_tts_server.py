@@ -3,17 +3,41 @@
 Simple TTS server for XTune app using Edge TTS (free)
 """
 
+import time
+# Start of module import, for the import-time budget (see Startup)
+IMPORT_STARTED = time.perf_counter()
+
 import asyncio
 import os
 import json
+import hashlib
+import itertools
+import math
+import queue
+import shutil
 import uuid
 import threading
 import random
+import re
 import subprocess
-from datetime import datetime
+import tempfile
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from flask import Flask, request, jsonify, send_file
-from pydub import AudioSegment
+from zoneinfo import ZoneInfo
+from flask import Flask, Response, request, jsonify, send_file, send_from_directory, stream_with_context
+from werkzeug.middleware.proxy_fix import ProxyFix
+from audio_processing import (concat_mp3_frames, decode_stitch, encode_renditions, extract_mp3_frames,
+                              postprocess_available, postprocess_stitch, scan_mp3_frames)
+from episode_store import EpisodeStore, disk_usage
+from job_events import EventHub
+from job_journal import JobJournal
+from tts_backends import EdgeBackend, EdgeOneShotBackend, FakeBackend, LocalBackend, TTSRouter
+from tts_sessions import EdgeTTSPool
+import metrics
 # API integrations removed for security
 
 app = Flask(__name__)
@@ -23,24 +47,360 @@ OUTPUT_DIR = Path("./audio_output")
 
 # API client removed for security
 
+# Number of episodes generated concurrently by the job worker pool
+JOB_WORKERS = int(os.environ.get("XTUNE_JOB_WORKERS", "2"))
+# Finished jobs are kept this long so clients can still poll /status/<job_id>
+JOB_RETENTION_SECONDS = int(os.environ.get("XTUNE_JOB_RETENTION_SECONDS", "3600"))
+# Priority lanes, most urgent first: scheduled pre-generation is never shed
+# and runs ahead of ad-hoc requests, which run ahead of batches
+JOB_LANES = {'scheduled': 0, 'interactive': 1, 'batch': 2}
+# Most ad-hoc jobs waiting for a worker; beyond this new episodes get a 503
+MAX_QUEUED_JOBS = int(os.environ.get("XTUNE_MAX_QUEUED_JOBS", "16"))
+# Per-client token bucket on episode requests: sustained rate and burst
+# (0 disables); the burst must cover a full /generate-batch
+RATE_LIMIT_PER_MINUTE = float(os.environ.get("XTUNE_RATE_LIMIT_PER_MINUTE", "6"))
+RATE_LIMIT_BURST = int(os.environ.get("XTUNE_RATE_LIMIT_BURST", "10"))
+# Proxies (nginx, load balancer) in front of the server whose
+# X-Forwarded-For/-Proto are trusted, so rate limits key on the real
+# client address rather than the proxy's; 0 when clients connect directly
+TRUSTED_PROXIES = int(os.environ.get("XTUNE_TRUSTED_PROXIES", "0"))
+
 HOST_VOICES = {
     "Ant": "en-US-GuyNeural",
     "Dawn": "en-US-AriaNeural"
 }
 
+# edge-tts prosody settings; part of the TTS cache key
+TTS_SETTINGS = {"rate": "+0%", "volume": "+0%", "pitch": "+0Hz"}
+
+# Synthesized lines are cached here, keyed on voice + text + TTS_SETTINGS
+TTS_CACHE_DIR = OUTPUT_DIR / "tts_cache"
+TTS_CACHE_MAX_BYTES = int(os.environ.get("XTUNE_TTS_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+
+# Processes for CPU-bound audio work (decode, stitch, encode), separate from
+# the I/O-bound TTS fan-out
+AUDIO_WORKERS = int(os.environ.get("XTUNE_AUDIO_WORKERS", str(os.cpu_count() or 1)))
+
+# Synthesis backends in order of preference: edge (pooled websockets),
+# edge-oneshot (edge-tts's public API, a connection per line), local
+# (offline espeak-ng, needs ffmpeg) and fake (canned silence, for tests)
+TTS_BACKENDS = [name.strip()
+                for name in os.environ.get("XTUNE_TTS_BACKENDS", "edge,edge-oneshot,local").split(",")
+                if name.strip()]
+# Requests each backend runs at once, across all episodes
+TTS_BACKEND_CONCURRENCY = {
+    'edge': int(os.environ.get("XTUNE_TTS_EDGE_CONCURRENCY", "8")),
+    'edge-oneshot': int(os.environ.get("XTUNE_TTS_EDGE_ONESHOT_CONCURRENCY", "4")),
+    'local': int(os.environ.get("XTUNE_TTS_LOCAL_CONCURRENCY", str(os.cpu_count() or 1))),
+    'fake': int(os.environ.get("XTUNE_TTS_FAKE_CONCURRENCY", "64")),
+}
+# espeak-ng voices standing in for HOST_VOICES in the local backend
+LOCAL_VOICES = {"en-US-GuyNeural": "en-us+m3", "en-US-AriaNeural": "en-us+f3"}
+# Send a request to the next backend too once it has taken this many times
+# its backend's usual time for that much text (0 disables hedging)
+TTS_HEDGE_FACTOR = float(os.environ.get("XTUNE_TTS_HEDGE_FACTOR", "3"))
+TTS_HEDGE_MIN_SECONDS = float(os.environ.get("XTUNE_TTS_HEDGE_MIN_SECONDS", "2"))
+
+# Trim edge silence, crossfade turns and match loudness between voices on
+# NumPy PCM (needs numpy and ffmpeg); otherwise segments are joined as-is
+POSTPROCESS = os.environ.get("XTUNE_POSTPROCESS", "1") == "1"
+
+# Warm edge-tts websockets kept per voice and shared by all requests
+TTS_SESSIONS_PER_VOICE = int(os.environ.get("XTUNE_TTS_SESSIONS_PER_VOICE", "4"))
+# Consecutive lines from the same host are sent as one request of at most
+# this many characters, with an SSML pause of TTS_LINE_BREAK_MS between lines
+TTS_BATCH_MAX_CHARS = int(os.environ.get("XTUNE_TTS_BATCH_MAX_CHARS", "1500"))
+TTS_LINE_BREAK_MS = int(os.environ.get("XTUNE_TTS_LINE_BREAK_MS", "300"))
+
+# Synthesized segments of an episode are kept in memory; past this many
+# bytes they spill to an unnamed temp file (in TMPDIR) instead. A plain
+# stitch reads them back one at a time; post-processing (and the decode
+# fallback) decodes the whole episode at once, so it isn't bounded by this
+SEGMENT_SPILL_BYTES = int(os.environ.get("XTUNE_SEGMENT_SPILL_BYTES", str(32 * 1024 * 1024)))
+
+# Max edge-tts calls in flight per episode, and per-line retry policy
+TTS_CONCURRENCY = int(os.environ.get("XTUNE_TTS_CONCURRENCY", "4"))
+TTS_MAX_ATTEMPTS = int(os.environ.get("XTUNE_TTS_MAX_ATTEMPTS", "3"))
+TTS_RETRY_BASE_DELAY = float(os.environ.get("XTUNE_TTS_RETRY_BASE_DELAY", "0.5"))
+
+# Most episodes accepted by one /generate-batch call
+MAX_BATCH_ITEMS = int(os.environ.get("XTUNE_MAX_BATCH_ITEMS", "10"))
+
+# Job events: SSE streams served from the event loop on this port (0
+# disables), and webhooks POSTed the listed events of every job, signed
+# with HMAC-SHA256 when a secret is set
+EVENTS_PORT = int(os.environ.get("XTUNE_EVENTS_PORT", "5002"))
+WEBHOOK_URLS = [url.strip() for url in os.environ.get("XTUNE_WEBHOOK_URLS", "").split(",") if url.strip()]
+WEBHOOK_EVENTS = os.environ.get("XTUNE_WEBHOOK_EVENTS", "done,failed").split(",")
+WEBHOOK_SECRET = os.environ.get("XTUNE_WEBHOOK_SECRET")
+
+# Startup: warn when importing this module takes longer than this, and
+# give up pre-warming TTS backends after this long
+IMPORT_BUDGET_SECONDS = float(os.environ.get("XTUNE_IMPORT_BUDGET_SECONDS", "0.5"))
+WARM_TIMEOUT_SECONDS = float(os.environ.get("XTUNE_WARM_TIMEOUT_SECONDS", "10"))
+
+# Publish schedule (hour of day in PUBLISH_TIMEZONE) from the README
+PUBLISH_SLOTS = {"morning": 8, "midday": 12, "evening": 18}
+PUBLISH_TIMEZONE = ZoneInfo("America/Los_Angeles")
+# Directory holding <slot>.txt inputs to pre-generate; unset disables it
+PREGEN_SOURCE_DIR = os.environ.get("XTUNE_PREGEN_SOURCE_DIR")
+# Start pre-generating this long before each publish time, +/- jitter
+PREGEN_LEAD_SECONDS = int(os.environ.get("XTUNE_PREGEN_LEAD_SECONDS", "900"))
+PREGEN_JITTER_SECONDS = int(os.environ.get("XTUNE_PREGEN_JITTER_SECONDS", "120"))
+# Pre-generation holds off while live requests wait for a worker, but
+# starts regardless this long before the publish time
+PREGEN_DEADLINE_SECONDS = int(os.environ.get("XTUNE_PREGEN_DEADLINE_SECONDS", "300"))
+
+# Episode storage lifecycle: total size cap and max age (0 disables the TTL)
+EPISODE_QUOTA_BYTES = int(os.environ.get("XTUNE_EPISODE_QUOTA_BYTES", str(5 * 1024 ** 3)))
+EPISODE_TTL_SECONDS = int(os.environ.get("XTUNE_EPISODE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Output profiles: the stitched MP3 plus renditions encoded from it in one
+# ffmpeg decode pass, stored as episode_<key><suffix>
+OUTPUT_PROFILES = {
+    'mp3': {'suffix': '.mp3', 'mimetype': 'audio/mpeg', 'args': []},
+    # Mono, speech-tuned MP3 for clients on metered connections
+    'mobile': {'suffix': '.mobile.mp3', 'mimetype': 'audio/mpeg',
+               'args': ['-ac', '1', '-ar', '22050', '-c:a', 'libmp3lame', '-b:a', '32k', '-f', 'mp3']},
+    # AAC in MP4 for AVPlayer on iOS
+    'aac': {'suffix': '.m4a', 'mimetype': 'audio/mp4',
+            'args': ['-ac', '1', '-c:a', 'aac', '-b:a', '48k', '-movflags', '+faststart', '-f', 'mp4']},
+    'opus': {'suffix': '.opus', 'mimetype': 'audio/ogg',
+             'args': ['-ac', '1', '-c:a', 'libopus', '-b:a', '24k', '-application', 'voip', '-f', 'ogg']},
+    # Directory with an HLS playlist (index.m3u8) and 10 second AAC segments
+    'hls': {'suffix': '.hls', 'mimetype': 'application/vnd.apple.mpegurl',
+            'args': ['-ac', '1', '-c:a', 'aac', '-b:a', '48k', '-f', 'hls',
+                     '-hls_time', '10', '-hls_playlist_type', 'vod']},
+}
+# Renditions built for every episode, besides the MP3 itself
+OUTPUT_RENDITIONS = [
+    name for name in os.environ.get("XTUNE_OUTPUT_RENDITIONS", "mobile,aac").split(",")
+    if name in OUTPUT_PROFILES and name != 'mp3'
+]
+
+# Episode files are named after their inputs, not their bytes: after an
+# eviction the same name can be rebuilt with different audio (another TTS
+# backend, a new script). Clients and CDNs may store them but must
+# revalidate with the ETag, which is cheap (304) for unchanged files.
+AUDIO_CACHE_MAX_AGE = 0
+# Hand file bodies to a fronting nginx/Apache via X-Sendfile instead of Python
+USE_X_SENDFILE = os.environ.get("XTUNE_USE_X_SENDFILE") == "1"
+
 # --- Initialization ---
-OUTPUT_DIR.mkdir(exist_ok=True)
-audio_generation_lock = threading.Lock()
+app.config['USE_X_SENDFILE'] = USE_X_SENDFILE
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES)
+# Opened by create_app (see Startup), not at import time
+episode_store = None
+
+def process_alive(pid: int) -> bool:
+    """Whether a process with this pid is still running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
 
 def cleanup_temp_files():
-    """Clean up leftover temporary files"""
-    for file in OUTPUT_DIR.glob("temp_*"):
+    """Clean up partial files left behind by crashed processes
+
+    Episodes, renditions and cache entries are written to <name>.<pid>.part
+    and renamed into place, so a crash leaves only .part files. Those of
+    live processes are left alone.
+    """
+    for path in [*OUTPUT_DIR.glob("*.part"), *TTS_CACHE_DIR.glob("*.part")]:
+        pid = path.name.split(".")[-2]
+        if pid.isdigit() and process_alive(int(pid)):
+            continue
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+
+# --- Metrics ---
+stage_seconds = metrics.Histogram(
+    "xtune_stage_seconds", "Time spent per episode generation stage", labels=("stage",))
+tts_line_seconds = metrics.Histogram(
+    "xtune_tts_line_seconds", "TTS latency per synthesized line", labels=("voice", "backend", "outcome"))
+bytes_written = metrics.Counter(
+    "xtune_bytes_written_total", "Audio bytes synthesized or written to disk", labels=("kind",))
+episodes_total = metrics.Counter(
+    "xtune_episodes_total", "Finished generation jobs", labels=("outcome",))
+incremental_blocks = metrics.Counter(
+    "xtune_incremental_blocks_total", "Incremental episode blocks by outcome", labels=("outcome",))
+admission_rejected = metrics.Counter(
+    "xtune_admission_rejected_total", "Requests refused by admission control", labels=("reason",))
+resumed_segments = metrics.Counter(
+    "xtune_resumed_segments_total", "Segments of resumed jobs restored from the journal")
+audio_pool_restarts = metrics.Counter(
+    "xtune_audio_pool_restarts_total", "Audio worker pools replaced after a worker died")
+
+# --- Audio Worker Pool ---
+audio_executor = None  # started by create_app
+audio_executor_lock = threading.Lock()
+# Set while the pool is broken and couldn't be replaced; /ready reports 503
+audio_workers_broken = threading.Event()
+
+def start_audio_workers(start_method: str = "fork"):
+    """Start the audio worker pool, starting every worker up front"""
+    if start_method not in multiprocessing.get_all_start_methods():
+        return ThreadPoolExecutor(max_workers=AUDIO_WORKERS, thread_name_prefix="xtune-audio")
+    executor = ProcessPoolExecutor(
+        max_workers=AUDIO_WORKERS,
+        mp_context=multiprocessing.get_context(start_method)
+    )
+    # Start every worker now; at startup that's before the event loop and
+    # job threads exist
+    executor.submit(os.getpid).result()
+    return executor
+
+def restart_audio_workers(broken):
+    """Replace the audio pool after a worker died (say, OOM-killed)
+
+    A dead worker breaks the whole ProcessPoolExecutor for good. The new
+    workers are spawned, not forked: a fork now would copy the job threads'
+    locks and the job journal's owner lock into them.
+    """
+    global audio_executor
+    with audio_executor_lock:
+        if audio_executor is not broken:
+            return  # another job replaced it already
+        print("⚠️  An audio worker died; restarting the audio worker pool")
+        audio_pool_restarts.inc()
+        broken.shutdown(wait=False)
         try:
-            file.unlink()
+            audio_executor = start_audio_workers("spawn")
+        except Exception:
+            audio_workers_broken.set()
+            raise
+        audio_workers_broken.clear()
+
+def run_audio_task(fn, *args):
+    """Run fn on the audio worker pool, replacing the pool once if a worker died"""
+    executor = audio_executor
+    try:
+        return executor.submit(fn, *args).result()
+    except BrokenProcessPool:
+        restart_audio_workers(executor)
+        return audio_executor.submit(fn, *args).result()
+
+# --- Event Loop ---
+# One long-lived loop runs all synthesis coroutines, so edge-tts connections
+# and loop setup are shared across requests instead of paid per episode.
+# Its thread is started by create_app.
+event_loop = asyncio.new_event_loop()
+
+def run_async(coro):
+    """Run a coroutine on the shared event loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, event_loop).result()
+
+def build_tts_backend(name: str):
+    """Construct a configured TTS backend, or None if it can't run here"""
+    concurrency = TTS_BACKEND_CONCURRENCY.get(name, 1)
+    if name == 'edge':
+        pool = EdgeTTSPool(TTS_SESSIONS_PER_VOICE, TTS_SETTINGS, TTS_LINE_BREAK_MS)
+        return EdgeBackend(concurrency, pool)
+    if name == 'edge-oneshot':
+        return EdgeOneShotBackend(concurrency, TTS_SETTINGS, TTS_LINE_BREAK_MS)
+    if name == 'local':
+        backend = LocalBackend(concurrency, LOCAL_VOICES, TTS_LINE_BREAK_MS)
+        if backend.available:
+            return backend
+        print("⚠️  Local TTS backend needs espeak-ng and ffmpeg; skipping it")
+        return None
+    if name == 'fake':
+        return FakeBackend(concurrency)
+    print(f"⚠️  Unknown TTS backend {name!r}; skipping it")
+    return None
+
+tts_router = None  # built by create_app
+# Job progress listeners and webhooks; its SSE server is started by create_app
+event_hub = EventHub(WEBHOOK_URLS, WEBHOOK_EVENTS, WEBHOOK_SECRET,
+                     static_topics=[f"slot:{slot}" for slot in PUBLISH_SLOTS])
+
+# --- TTS Cache ---
+tts_cache_lock = threading.Lock()
+# key -> size in bytes, least recently used first; filled by load_tts_cache_index
+tts_cache_index = OrderedDict()
+tts_cache_stats = {
+    'hits': 0,
+    'misses': 0,
+    'evictions': 0,
+    'bytes': 0
+}
+
+def load_tts_cache_index():
+    """Index the cache directory, oldest entries first"""
+    entries = sorted(TTS_CACHE_DIR.glob("*.mp3"), key=lambda f: f.stat().st_mtime)
+    with tts_cache_lock:
+        tts_cache_index.update((f.stem, f.stat().st_size) for f in entries)
+        tts_cache_stats['bytes'] = sum(tts_cache_index.values())
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different inputs share a cache entry"""
+    return " ".join(text.split())
+
+def tts_cache_key(text: str, voice: str) -> str:
+    """Content address for synthesized text (one line, or several joined by newlines)"""
+    settings = dict(TTS_SETTINGS)
+    if "\n" in text:
+        settings['break_ms'] = TTS_LINE_BREAK_MS
+    payload = json.dumps({'voice': voice, 'text': text, **settings}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def tts_cache_fetch(key: str):
+    """Return a cached line's audio, or None on a miss"""
+    cached_path = TTS_CACHE_DIR / f"{key}.mp3"
+    with tts_cache_lock:
+        if key not in tts_cache_index:
+            tts_cache_stats['misses'] += 1
+            return None
+        try:
+            audio = cached_path.read_bytes()
+            os.utime(cached_path)
+        except OSError:
+            # Entry vanished from disk; treat as a miss
+            tts_cache_stats['bytes'] -= tts_cache_index.pop(key)
+            tts_cache_stats['misses'] += 1
+            return None
+        tts_cache_index.move_to_end(key)
+        tts_cache_stats['hits'] += 1
+        return audio
+
+def tts_cache_store(key: str, audio: bytes):
+    """Add a freshly synthesized line to the cache and evict down to the size cap"""
+    cached_path = TTS_CACHE_DIR / f"{key}.mp3"
+    with tts_cache_lock:
+        if key in tts_cache_index:
+            return
+        # Written aside and renamed so a crash never leaves a truncated entry
+        partial_path = cached_path.with_suffix(f".{os.getpid()}.part")
+        try:
+            partial_path.write_bytes(audio)
+            os.replace(partial_path, cached_path)
         except OSError as e:
-            print(f"Error cleaning up {file.name}: {e}")
+            print(f"Error caching {key[:12]}: {e}")
+            partial_path.unlink(missing_ok=True)
+            return
+        tts_cache_index[key] = len(audio)
+        tts_cache_stats['bytes'] += tts_cache_index[key]
+
+        while tts_cache_stats['bytes'] > TTS_CACHE_MAX_BYTES and len(tts_cache_index) > 1:
+            old_key, size = tts_cache_index.popitem(last=False)
+            (TTS_CACHE_DIR / f"{old_key}.mp3").unlink(missing_ok=True)
+            tts_cache_stats['evictions'] += 1
+            tts_cache_stats['bytes'] -= size
 
-cleanup_temp_files()
+def tts_cache_contains(key: str) -> bool:
+    with tts_cache_lock:
+        return key in tts_cache_index
+
+def tts_cache_summary() -> dict:
+    """Hit/miss counters and current cache footprint"""
+    with tts_cache_lock:
+        return {**tts_cache_stats, 'entries': len(tts_cache_index)}
 
 # --- Script Generation ---
 def generate_podcast_script(tweets_text: str) -> str:
@@ -87,133 +447,1376 @@ Ant: We seem to be having some technical difficulties getting the latest updates
 Dawn: We'll be back shortly with your personalized news summary. Thanks for your patience!
     """
 
+def split_tweets(tweets_text: str):
+    """The tweets in a request, which the app separates with blank lines"""
+    return [normalize_text(tweet) for tweet in re.split(r"\n\s*\n", tweets_text) if tweet.strip()]
+
+def block_key(kind: str, tweets) -> str:
+    """Content address for an incremental episode block's script"""
+    payload = json.dumps({'kind': kind, 'tweets': list(tweets)}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def generate_block_script(kind: str, tweet: str, tweets) -> str:
+    """Generate the script for one block: the intro, one tweet's reactions, or the outro"""
+    print(f"🧠 Generating {kind} block script...")
+    task = {
+        'intro': "Write the intro (10–15 seconds): a shared greeting and a brief mention of what's coming up.\n\n"
+                 "Today's tweets:\n" + "\n\n".join(tweets),
+        'tweet': "Write the reaction to this tweet (30 sec - 1.5 minutes): one host introduces it in context, "
+                 "then they go back and forth. Don't mention other tweets or where this one falls in the show.\n\n"
+                 f"Tweet:\n{tweet}",
+        'outro': "Write the outro: thank listeners and CTA to come back next time.",
+    }[kind]
+    prompt = f"""
+You are writing one segment of a podcast script for two warm, charismatic hosts:
+Dawn (curious, empathetic, thoughtful)
+Ant (witty, energetic, insightful)
+
+{task}
+
+Ensure the output format is clean, with each line starting with "Ant:" or "Dawn:", followed by their dialogue.
+    """
+
+    # API call removed for security - using fallback script
+    return generate_fallback_block(kind, tweet, len(tweets))
+
+def generate_fallback_block(kind: str, tweet: str, tweet_count: int) -> str:
+    if kind == 'intro':
+        return (f"Dawn: Welcome to your daily briefing.\n"
+                f"Ant: We've got {tweet_count} stories to get through, so let's dive in.")
+    if kind == 'outro':
+        return "Ant: That's all for this update.\nDawn: Thanks for listening, and come back next time!"
+    return f"Dawn: Here's one that caught our eye.\nAnt: {tweet}"
+
+def generate_incremental_script(tweets_text: str) -> str:
+    """Assemble a script from blocks, regenerating only those whose tweets changed
+
+    The episode is an intro (keyed on the whole tweet set), one block per
+    tweet (keyed on that tweet alone) and an outro. Block scripts are kept
+    in the episode store, and blocks are separated by blank lines so
+    plan_synthesis never merges turns across them: an unchanged block
+    yields the same TTS requests, which the line cache then answers.
+    """
+    tweets = split_tweets(tweets_text)
+    blocks = ([('intro', "", block_key('intro', tweets))]
+              + [('tweet', tweet, block_key('tweet', [tweet])) for tweet in tweets]
+              + [('outro', "", block_key('outro', []))])
+    scripts = []
+    regenerated = 0
+    for kind, tweet, key in blocks:
+        script = episode_store.get_block(key)
+        if script is None:
+            script = generate_block_script(kind, tweet, tweets).strip()
+            episode_store.put_block(key, script)
+            regenerated += 1
+        scripts.append(script)
+    incremental_blocks.inc(regenerated, outcome='regenerated')
+    incremental_blocks.inc(len(blocks) - regenerated, outcome='reused')
+    print(f"🧱 Regenerated {regenerated} of {len(blocks)} blocks")
+    return "\n\n".join(scripts)
+
 # --- Audio Generation ---
-async def text_to_speech(text: str, voice: str, output_path: Path) -> bool:
-    """Converts a single line of text to speech using edge-tts"""
+async def text_to_speech(text: str, voice: str):
+    """Converts text to speech on the TTS backends, returning (MP3 bytes, backend name)
+
+    Newlines separate lines spoken with a pause. Returns (None, None) if
+    every backend failed.
+    """
     print(f"🎤 Generating audio for: {text[:30]}... (Voice: {voice})")
     try:
-        import edge_tts
-        communicate = edge_tts.Communicate(text, voice)
-        await communicate.save(str(output_path))
-        return output_path.exists() and output_path.stat().st_size > 0
+        return await tts_router.synthesize(text.split("\n"), voice)
     except Exception as e:
         print(f"Error in text_to_speech: {e}")
-        return False
+        return None, None
 
-async def generate_and_stitch_audio(script: str, final_output_path: Path) -> float:
-    """Generate audio for each line and stitch them together"""
-    print("🎧 Starting audio generation and stitching...")
-    lines = [line.strip() for line in script.split('\n') if line.strip()]
-    temp_files = []
-    
-    tasks = []
-    for i, line in enumerate(lines):
+async def synthesize_line(text: str, voice: str):
+    """Synthesize a line (or newline-joined run of lines), reusing the TTS cache when possible"""
+    text = "\n".join(normalize_text(line) for line in text.split("\n"))
+    key = tts_cache_key(text, voice)
+    # Cache files may sit on a slow (network) disk; keep their I/O off the
+    # event loop, which every episode's TTS shares
+    loop = asyncio.get_running_loop()
+    audio = await loop.run_in_executor(None, tts_cache_fetch, key)
+    if audio is not None:
+        print(f"♻️  Reusing cached audio for: {text[:30]}... (Voice: {voice})")
+        return audio
+
+    start = time.perf_counter()
+    audio, backend = await text_to_speech(text, voice)
+    tts_line_seconds.observe(time.perf_counter() - start, voice=voice, backend=backend or 'none',
+                             outcome='ok' if audio else 'error')
+    if not audio:
+        return None
+    bytes_written.inc(len(audio), kind='segment')
+    # Fallback backends sound different; only cache the preferred one's audio
+    # so the next build of this text goes back to it
+    if backend == tts_router.preferred:
+        await loop.run_in_executor(None, tts_cache_store, key, audio)
+    return audio
+
+async def synthesize_with_retry(text: str, voice: str, semaphore: asyncio.Semaphore):
+    """Synthesize one line under the fan-out limit, retrying with backoff and jitter"""
+    for attempt in range(1, TTS_MAX_ATTEMPTS + 1):
+        async with semaphore:
+            audio = await synthesize_line(text, voice)
+            if audio:
+                return audio
+        if attempt < TTS_MAX_ATTEMPTS:
+            # Full jitter keeps retries from many lines from arriving in lockstep
+            delay = random.uniform(0, TTS_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+            print(f"🔁 Retrying line in {delay:.2f}s (attempt {attempt + 1}/{TTS_MAX_ATTEMPTS})")
+            await asyncio.sleep(delay)
+    return None
+
+def checkpoint_segment(job_id: str, index: int, key: str, audio: bytes):
+    """Journal a finished segment; its audio is kept too unless the TTS cache has it"""
+    checksum = hashlib.sha256(audio).hexdigest()
+    job_journal.add_segment(job_id, index, key, checksum, None if tts_cache_contains(key) else audio)
+
+def restore_segment(checkpoint, key: str):
+    """Audio of a journaled segment, or None if it's gone or fails its checksum"""
+    if checkpoint is None or checkpoint['cache_key'] != key:
+        return None
+    audio = checkpoint['audio'] or tts_cache_fetch(key)
+    if audio is None or hashlib.sha256(audio).hexdigest() != checkpoint['checksum']:
+        return None
+    return audio
+
+# Bytes held by open EpisodeScratch buffers, in memory and spilled to disk
+scratch_bytes = {'memory': 0, 'disk': 0}
+scratch_bytes_lock = threading.Lock()
+
+def track_scratch_size(old_size: int, new_size: int):
+    """Account a scratch buffer growing (or closing, new_size 0) in scratch_bytes"""
+    def where(size):
+        return 'disk' if size > SEGMENT_SPILL_BYTES else 'memory'
+    with scratch_bytes_lock:
+        scratch_bytes[where(old_size)] -= old_size
+        scratch_bytes[where(new_size)] += new_size
+
+class EpisodeScratch:
+    """Synthesized segments of one episode, kept in memory until SEGMENT_SPILL_BYTES
+
+    Segments are appended in completion order to one spooled buffer that
+    rolls over to an unnamed temp file when it grows too large, so nothing
+    is left on disk if the process dies. The buffer is closed once the
+    episode and every stream reading it have released it.
+    """
+
+    def __init__(self, count: int):
+        self.buffer = tempfile.SpooledTemporaryFile(max_size=SEGMENT_SPILL_BYTES)
+        self.spans = [None] * count
+        self.size = 0
+        self.holders = 1
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.spans)
+
+    def write(self, index: int, data: bytes):
+        with self.lock:
+            offset = self.buffer.seek(0, os.SEEK_END)
+            self.buffer.write(data)
+            self.spans[index] = (offset, len(data))
+            self.size += len(data)
+            track_scratch_size(self.size - len(data), self.size)
+
+    def read(self, index: int) -> bytes:
+        """A segment's audio; raises ValueError once the scratch is closed"""
+        with self.lock:
+            offset, length = self.spans[index]
+            self.buffer.seek(offset)
+            return self.buffer.read(length)
+
+    def __iter__(self):
+        """Segments in script order, read one at a time"""
+        return (self.read(index) for index in range(len(self.spans)))
+
+    def retain(self) -> bool:
+        """Keep the segments readable for another reader; False if already closed"""
+        with self.lock:
+            if self.holders == 0:
+                return False
+            self.holders += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.holders -= 1
+            if self.holders == 0:
+                self.buffer.close()
+                track_scratch_size(self.size, 0)
+
+class EpisodeProgress:
+    """Tracks which segments of an episode have been synthesized so far
+
+    With a job_id, every change is published as a progress event.
+    """
+
+    def __init__(self, output_path: Path, job_id: str = None):
+        self.output_path = output_path
+        self.job_id = job_id
+        self.condition = threading.Condition()
+        self.segments = None  # EpisodeScratch, once planned
+        self.planned_at = None
+        self.ready = set()
+        self.finished = False
+
+    def planned(self, scratch: EpisodeScratch):
+        with self.condition:
+            self.segments = scratch
+            self.planned_at = time.monotonic()
+            self.condition.notify_all()
+        self.publish()
+
+    def segment_ready(self, index: int):
+        with self.condition:
+            self.ready.add(index)
+            self.condition.notify_all()
+        self.publish()
+
+    def summary(self) -> dict:
+        """Segments done so far and a rough estimate of the seconds left"""
+        with self.condition:
+            total = len(self.segments) if self.segments is not None else None
+            done = len(self.ready)
+            elapsed = time.monotonic() - self.planned_at if self.planned_at else 0.0
+        eta = elapsed / done * (total - done) if total and done else None
+        return {'segmentsDone': done, 'segmentsTotal': total,
+                'etaSeconds': round(eta, 1) if eta is not None else None}
+
+    def publish(self):
+        if self.job_id:
+            publish_job_event(self.job_id, 'progress', {'status': 'running', **self.summary()})
+
+    def finish(self):
+        with self.condition:
+            self.finished = True
+            self.condition.notify_all()
+
+    def wait_for_segment(self, index: int):
+        """Block until segment `index` is ready and return its audio
+
+        Returns None once there is nothing more to stream. The caller must
+        hold the segment buffer (EpisodeScratch.retain).
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.finished or (
+                self.segments is not None
+                and (index >= len(self.segments) or index in self.ready)
+            ))
+            if self.segments is None or index >= len(self.segments) or index not in self.ready:
+                return None
+        return self.segments.read(index)
+
+def split_sentences(text: str, max_chars: int):
+    """Split text into chunks of at most max_chars, breaking between sentences where possible"""
+    chunks = []
+    current = ""
+    for sentence in re.split(r"(?<=[.!?])\s+", text):
+        # A single over-long sentence falls back to word boundaries
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+def plan_synthesis(script: str):
+    """Turn a script into an ordered list of [voice, text] synthesis requests
+
+    Lines are parsed into speaker turns and adjacent lines from the same
+    host are merged into one request, newline-separated so the pause
+    between them is kept as an SSML break. Requests stay under
+    TTS_BATCH_MAX_CHARS; an over-long line is split at sentence boundaries.
+    Turns are never merged across a blank line, which separates blocks.
+    """
+    segments = []
+    previous_voice = None
+    for line in script.split('\n'):
+        if not line.strip():
+            previous_voice = None
+            continue
         parts = line.split(":", 1)
         if len(parts) != 2:
             continue
-            
+
         host, dialogue = parts
         voice = HOST_VOICES.get(host.strip())
-        if not voice:
+        dialogue = normalize_text(dialogue)
+        if not voice or not dialogue:
             continue
-            
-        temp_path = OUTPUT_DIR / f"temp_{uuid.uuid4()}.mp3"
-        temp_files.append(temp_path)
-        tasks.append(text_to_speech(dialogue.strip(), voice, temp_path))
 
+        for chunk in split_sentences(dialogue, TTS_BATCH_MAX_CHARS):
+            if voice == previous_voice and len(segments[-1][1]) + 1 + len(chunk) <= TTS_BATCH_MAX_CHARS:
+                segments[-1][1] += "\n" + chunk
+            else:
+                segments.append([voice, chunk])
+            previous_voice = voice
+    return segments
+
+def stitch_episode(scratch: EpisodeScratch, voices, output_path: Path) -> float:
+    """Stitch an episode's segments into output_path, returning its duration
+
+    Segments that share codec parameters are joined frame by frame right
+    here, reading one segment at a time from the scratch (and so from its
+    spill file). Decoding, to post-process or to join segments that differ,
+    is CPU-bound and needs every segment at once, so it goes to the audio
+    worker pool.
+    """
+    if POSTPROCESS:
+        return run_audio_task(postprocess_stitch, list(scratch), voices, output_path)
+    duration = concat_mp3_frames(scratch, output_path)
+    if duration > 0:
+        return duration
+    print("🔄 Segments differ in codec parameters, decoding to stitch")
+    return run_audio_task(decode_stitch, list(scratch), output_path)
+
+async def generate_and_stitch_audio(script: str, final_output_path: Path,
+                                    progress: EpisodeProgress = None, job_id: str = None) -> float:
+    """Generate audio for each line and stitch them together
+
+    With a job_id, finished segments are checkpointed in the job journal
+    and segments checkpointed by an earlier, interrupted run are reused.
+    """
+    print("🎧 Starting audio generation and stitching...")
+    segments = plan_synthesis(script)
+    if not segments:
+        print("❌ Script has no host lines to synthesize")
+        return 0.0
+    scratch = EpisodeScratch(len(segments))
+    semaphore = asyncio.Semaphore(TTS_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+    checkpoints = job_journal.segments(job_id) if job_id else {}
+    restored = []
+
+    async def synthesize_segment(index, text, voice):
+        key = tts_cache_key(text, voice)
+        audio = await loop.run_in_executor(None, restore_segment, checkpoints.get(index), key)
+        if audio is not None:
+            restored.append(index)
+        else:
+            audio = await synthesize_with_retry(text, voice, semaphore)
+            if audio is None:
+                return False
+            if job_id:
+                await loop.run_in_executor(None, checkpoint_segment, job_id, index, key, audio)
+        scratch.write(index, audio)
+        if progress:
+            progress.segment_ready(index)
+        return True
+
+    tasks = [synthesize_segment(index, text, voice) for index, (voice, text) in enumerate(segments)]
+    if progress:
+        progress.planned(scratch)
+    tts_start = time.perf_counter()
     results = await asyncio.gather(*tasks)
-    
+    tts_elapsed = time.perf_counter() - tts_start
+    stage_seconds.observe(tts_elapsed, stage='tts')
+    if restored:
+        print(f"📓 Restored {len(restored)} of {len(segments)} segments from the job journal")
+        resumed_segments.inc(len(restored))
+
     if not all(results):
-        print("❌ One or more audio segments failed to generate.")
-        cleanup_temp_files()
+        # Lines that did succeed are in the TTS cache, so a retry of this
+        # episode only re-synthesizes the ones that failed
+        print(f"❌ {results.count(False)} of {len(results)} audio segments failed to generate.")
+        scratch.release()
         return 0.0
 
-    print("🧩 Stitching audio files together...")
-    # Stitch audio files together
-    combined_audio = AudioSegment.empty()
-    for temp_file in temp_files:
-        if temp_file.exists():
-            segment = AudioSegment.from_mp3(temp_file)
-            combined_audio += segment
-
-    combined_audio.export(final_output_path, format="mp3")
+    if scratch.size > SEGMENT_SPILL_BYTES:
+        print(f"💾 Segments spilled to disk ({scratch.size} bytes)")
+    print("🧩 Stitching audio segments together...")
+    # Off the event loop so other episodes' TTS keeps flowing meanwhile
+    stitch_start = time.perf_counter()
+    # Written aside and renamed, so episode_<key>.mp3 only ever exists complete
+    partial_path = final_output_path.with_name(f"{final_output_path.name}.{os.getpid()}.part")
+    try:
+        voices = [voice for voice, _ in segments]
+        duration = await loop.run_in_executor(None, stitch_episode, scratch, voices, partial_path)
+        os.replace(partial_path, final_output_path)
+    finally:
+        scratch.release()
+        partial_path.unlink(missing_ok=True)
+    stitch_elapsed = time.perf_counter() - stitch_start
+    # Stitching includes encoding and writing the episode file
+    stage_seconds.observe(stitch_elapsed, stage='stitch')
+    bytes_written.inc(final_output_path.stat().st_size, kind='episode')
     print(f"✅ Final audio saved to: {final_output_path}")
-    
-    # Clean up temporary files
-    print("🗑️ Cleaning up temporary files...")
-    for temp_file in temp_files:
-        if temp_file.exists():
-            temp_file.unlink()
-            
-    return len(combined_audio) / 1000.0  # Duration in seconds
+    print(f"⏱️  {len(segments)} segments: tts {tts_elapsed:.2f}s, stitch {stitch_elapsed:.2f}s")
+
+    return duration  # Duration in seconds
+
+# --- Admission Control ---
+class AdmissionRejected(Exception):
+    """A request refused to protect the server, with a Retry-After hint"""
+
+    def __init__(self, status: int, message: str, retry_after: int):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Refills at `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, cost: float) -> float:
+        """Take cost tokens; returns 0, or the seconds until they'd be available"""
+        self.refill()
+        cost = min(cost, self.capacity)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+# client address -> TokenBucket
+rate_buckets = {}
+rate_buckets_lock = threading.Lock()
+
+def check_rate_limit(client: str, cost: int = 1):
+    """Charge a client for `cost` episodes, raising AdmissionRejected (429) if over its rate"""
+    if RATE_LIMIT_PER_MINUTE <= 0:
+        return
+    with rate_buckets_lock:
+        if len(rate_buckets) > 10000:
+            # Forget clients whose buckets have refilled; they'd start full anyway
+            for bucket_client, bucket in list(rate_buckets.items()):
+                bucket.refill()
+                if bucket.tokens >= bucket.capacity:
+                    del rate_buckets[bucket_client]
+        bucket = rate_buckets.setdefault(
+            client, TokenBucket(RATE_LIMIT_PER_MINUTE / 60.0, RATE_LIMIT_BURST))
+        wait = bucket.take(cost)
+    if wait > 0:
+        admission_rejected.inc(reason='rate_limited')
+        raise AdmissionRejected(429, 'Too many requests', math.ceil(wait))
+
+def rejection_response(e: AdmissionRejected):
+    """429/503 response telling the client when to come back"""
+    response = jsonify({'success': False, 'error': str(e), 'retryAfter': e.retry_after})
+    response.status_code = e.status
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+# --- Job Queue ---
+# Opened by create_app after the audio workers are forked, so they don't
+# inherit (and outlive us holding) the journal's owner lock
+job_journal = None
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="xtune-job")
+# Queued jobs by (lane priority, arrival); every executor task runs the most
+# urgent one, so the pool's FIFO order doesn't decide which job goes next
+job_queue = queue.PriorityQueue()
+job_sequence = itertools.count()
+# Moving average of episode build time, for Retry-After estimates
+recent_episode_seconds = 30.0
+jobs = {}
+job_futures = {}
+job_progress = {}
+# episode key -> id of the most recent job for that input
+episode_jobs = {}
+jobs_lock = threading.Lock()
+shutting_down = threading.Event()
+
+def episode_key(tweets_text: str, incremental: bool = False) -> str:
+    """Content address for an episode: normalized input plus voice config"""
+    # Incremental episodes are keyed per tweet, since their block split
+    # depends on the blank lines between tweets
+    text = split_tweets(tweets_text) if incremental else normalize_text(tweets_text)
+    payload = json.dumps({
+        'text': text,
+        'incremental': incremental,
+        'voices': HOST_VOICES,
+        'tts': TTS_SETTINGS,
+        'batching': [TTS_BATCH_MAX_CHARS, TTS_LINE_BREAK_MS],
+        'postprocess': POSTPROCESS
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+def rendition_filename(filename: str, profile: str) -> str:
+    """File name of an episode's rendition in the given output profile"""
+    return Path(filename).stem + OUTPUT_PROFILES[profile]['suffix']
+
+def encode_episode_renditions(output_path: Path):
+    """Encode the configured renditions of a stitched episode on the audio pool"""
+    renditions = [
+        (OUTPUT_PROFILES[name]['args'], OUTPUT_DIR / rendition_filename(output_path.name, name))
+        for name in OUTPUT_RENDITIONS
+    ]
+    if not renditions:
+        return
+    try:
+        with stage_seconds.time(stage='renditions'):
+            run_audio_task(encode_renditions, output_path, renditions)
+    except (OSError, subprocess.CalledProcessError) as e:
+        # The MP3 is complete on its own; clients just won't be offered renditions
+        print(f"⚠️  Could not encode renditions: {e}")
+        return
+    for _, path in renditions:
+        bytes_written.inc(disk_usage(path), kind='rendition')
+
+def episode_result(output_filename: str, duration: float, script: str) -> dict:
+    """Fields returned to clients for a finished episode"""
+    renditions = {}
+    for name in OUTPUT_RENDITIONS:
+        rendition = rendition_filename(output_filename, name)
+        if (OUTPUT_DIR / rendition).exists():
+            if name == 'hls':
+                rendition += "/index.m3u8"
+            renditions[name] = f"http://localhost:5001/audio/{rendition}"
+    return {
+        'audioURL': f"http://localhost:5001/audio/{output_filename}",
+        'duration': duration,
+        'script': script,
+        'renditions': renditions
+    }
+
+def load_episode(key: str):
+    """Return the result for an already built episode, or None"""
+    row = episode_store.get(key)
+    if not row:
+        return None
+    episode_store.touch(row['filename'])
+    return episode_result(row['filename'], row['duration'], row['script'])
+
+def build_episode(tweets_text: str, key: str, progress: EpisodeProgress = None,
+                  incremental: bool = False, job_id: str = None) -> dict:
+    """Run the full script + TTS + stitch cycle for one episode
+
+    A journaled job reuses the script its interrupted run generated, so
+    its checkpointed segments still line up.
+    """
+    script = job_journal.script(job_id) if job_id else None
+    if script is None:
+        with stage_seconds.time(stage='script'):
+            if incremental:
+                script = generate_incremental_script(tweets_text)
+            else:
+                script = generate_podcast_script(tweets_text)
+        if job_id:
+            job_journal.set_script(job_id, script)
+
+    output_filename = f"episode_{key}.mp3"
+    output_path = OUTPUT_DIR / output_filename
+
+    duration = run_async(generate_and_stitch_audio(script, output_path, progress, job_id))
+    if duration <= 0:
+        raise RuntimeError("Audio generation failed")
+    encode_episode_renditions(output_path)
+
+    # Indexed last: an index entry marks the episode as complete and reusable
+    episode_store.add(key, output_filename, duration, script)
+    return episode_result(output_filename, duration, script)
+
+def update_job(job_id: str, **fields):
+    """Update a job record under the jobs lock, publishing status changes"""
+    with jobs_lock:
+        jobs[job_id].update(fields, updated_at=time.time())
+        job = dict(jobs[job_id])
+    if 'status' in fields:
+        publish_job_state(job_id, job)
+
+def publish_job_event(job_id: str, name: str, data: dict):
+    """Send an event to listeners of a job and of any slot it builds; safe from any thread"""
+    topics = [job_id] + [f"slot:{slot}" for slot, slot_job in list(slot_jobs.items()) if slot_job == job_id]
+    event_loop.call_soon_threadsafe(event_hub.publish, topics, name, {'jobId': job_id, **data})
+
+def publish_job_state(job_id: str, job: dict):
+    """Publish a job's status (queued, running, done or failed) as an event of that name"""
+    data = job_response(job_id, job)
+    if job['status'] == 'queued':
+        data['etaSeconds'] = round(recent_episode_seconds * (1 + job_queue.qsize() / JOB_WORKERS), 1)
+    elif job['status'] == 'running' and job_id in job_progress:
+        data.update(job_progress[job_id].summary())
+    publish_job_event(job_id, job['status'], data)
+
+def get_job(job_id: str):
+    """Return a snapshot of a job record, or None if unknown"""
+    with jobs_lock:
+        job = jobs.get(job_id)
+        return dict(job) if job else None
+
+def prune_jobs():
+    """Forget finished jobs older than JOB_RETENTION_SECONDS"""
+    cutoff = time.time() - JOB_RETENTION_SECONDS
+    with jobs_lock:
+        for job_id in [
+            job_id for job_id, job in jobs.items()
+            if job['status'] in ('done', 'failed') and job['updated_at'] < cutoff
+        ]:
+            job = jobs.pop(job_id)
+            job_futures.pop(job_id, None)
+            job_progress.pop(job_id, None)
+            event_loop.call_soon_threadsafe(event_hub.forget, job_id)
+            if episode_jobs.get(job['episode_key']) == job_id:
+                del episode_jobs[job['episode_key']]
+
+def queued_job_count() -> int:
+    """Ad-hoc jobs waiting for a worker; call with jobs_lock held"""
+    return sum(1 for job in jobs.values()
+               if job['status'] == 'queued' and job['lane'] != 'scheduled')
+
+def check_queue_capacity(count: int = 1):
+    """Raise AdmissionRejected (503) unless `count` more jobs fit; call with jobs_lock held"""
+    queued = queued_job_count()
+    if queued + count > MAX_QUEUED_JOBS:
+        admission_rejected.inc(reason='queue_full')
+        wait = (queued + count) * recent_episode_seconds / JOB_WORKERS
+        raise AdmissionRejected(503, 'Server is at capacity', max(math.ceil(wait), 1))
+
+def run_next_job():
+    """Executor task: run the most urgent queued job"""
+    _, _, job_id, tweets_text, key, incremental, future = job_queue.get_nowait()
+    try:
+        run_job(job_id, tweets_text, key, incremental)
+    finally:
+        future.set_result(None)
+
+def run_job(job_id: str, tweets_text: str, key: str, incremental: bool = False):
+    """Generate the episode and record the outcome"""
+    global recent_episode_seconds
+    # Jobs queued while starting up (or resumed) run once backends are warm
+    ready.wait()
+    stage_seconds.observe(time.time() - get_job(job_id)['created_at'], stage='queue_wait')
+    update_job(job_id, status='running')
+    progress = job_progress[job_id]
+    start = time.perf_counter()
+    try:
+        result = build_episode(tweets_text, key, progress, incremental, job_id)
+    except Exception as e:
+        print(f"❌ Job {job_id} failed: {e}")
+        update_job(job_id, status='failed', error=str(e))
+        episodes_total.inc(outcome='failed')
+        return
+    finally:
+        job_journal.finish(job_id)
+        progress.finish()
+    elapsed = time.perf_counter() - start
+    stage_seconds.observe(elapsed, stage='episode')
+    with jobs_lock:
+        recent_episode_seconds = 0.8 * recent_episode_seconds + 0.2 * elapsed
+    episodes_total.inc(outcome='done')
+    print(f"✅ Job {job_id} done")
+    update_job(job_id, status='done', **result)
+
+def submit_job(tweets_text: str, lane: str = 'interactive', incremental: bool = False,
+               client: str = None):
+    """Queue an episode for generation in a priority lane, returning (job_id, future)
+
+    Identical inputs are deduplicated: a request joins an in-flight job for
+    the same episode key, or completes immediately if the episode exists.
+    New ad-hoc jobs raise AdmissionRejected once MAX_QUEUED_JOBS are waiting,
+    and are charged to `client`'s rate limit; joins and reuses are free.
+    Incremental jobs reuse the scripts and audio of unchanged tweet blocks.
+    """
+    prune_jobs()
+    key = episode_key(tweets_text, incremental)
+    with jobs_lock:
+        joined = join_in_flight(key)
+    if joined:
+        return joined
+
+    # The episode store and journal are read and written outside jobs_lock,
+    # which every /status poll and progress update takes
+    job_id = str(uuid.uuid4())
+    future = Future()
+    now = time.time()
+    result = load_episode(key)
+    if not result:
+        # Journaled before it's queued, so no worker runs an unjournaled job
+        job_journal.add(job_id, key, tweets_text, incremental, lane, now)
+    admitted = False
+    try:
+        with jobs_lock:
+            # A concurrent request may have queued this episode meanwhile
+            joined = join_in_flight(key)
+            if joined:
+                return joined
+            if result:
+                print(f"♻️  Reusing existing episode {key}")
+                jobs[job_id] = {'status': 'done', 'episode_key': key, 'lane': lane,
+                                'created_at': now, 'updated_at': now, **result}
+                publish_job_state(job_id, jobs[job_id])
+                future.set_result(None)
+            else:
+                if lane != 'scheduled':
+                    check_queue_capacity()
+                if client:
+                    check_rate_limit(client)
+                enqueue_job(job_id, tweets_text, key, lane, incremental, future, now)
+            episode_jobs[key] = job_id
+            job_futures[job_id] = future
+            admitted = True
+    finally:
+        if not admitted and not result:
+            job_journal.finish(job_id)
+    return job_id, future
+
+def join_in_flight(key: str):
+    """(job_id, future) of a queued or running job for an episode, or None; call with jobs_lock held"""
+    existing_id = episode_jobs.get(key)
+    existing = jobs.get(existing_id)
+    if existing and existing['status'] in ('queued', 'running'):
+        print(f"🔗 Joining in-flight job {existing_id}")
+        return existing_id, job_futures[existing_id]
+    return None
+
+def enqueue_job(job_id: str, tweets_text: str, key: str, lane: str, incremental: bool,
+                future: Future, created_at: float):
+    """Record a queued job and hand it to the worker pool; call with jobs_lock held"""
+    jobs[job_id] = {'status': 'queued', 'episode_key': key, 'lane': lane,
+                    'created_at': created_at, 'updated_at': time.time()}
+    job_progress[job_id] = EpisodeProgress(OUTPUT_DIR / f"episode_{key}.mp3", job_id)
+    publish_job_state(job_id, jobs[job_id])
+    job_queue.put((JOB_LANES[lane], next(job_sequence), job_id, tweets_text, key,
+                   incremental, future))
+    job_executor.submit(run_next_job)
+
+def resume_jobs():
+    """Re-queue journaled jobs whose server stopped before finishing them
+
+    Resumed jobs keep their ids, lanes and scripts and skip admission
+    control, since they were admitted once already. Only segments that
+    weren't checkpointed (or fail their checksum) are synthesized again.
+    """
+    orphans = job_journal.claim_orphans()
+    if orphans:
+        print(f"📓 Resuming {len(orphans)} unfinished jobs from the job journal")
+    for row in orphans:
+        job_id, key = row['job_id'], row['episode_key']
+        future = Future()
+        with jobs_lock:
+            result = load_episode(key)
+            if result or key in episode_jobs:
+                # Built (or being built) already; the journal just wasn't cleared
+                job_journal.finish(job_id)
+                if not result:
+                    continue
+                now = time.time()
+                jobs[job_id] = {'status': 'done', 'episode_key': key, 'lane': row['lane'],
+                                'created_at': row['created_at'], 'updated_at': now, **result}
+                publish_job_state(job_id, jobs[job_id])
+                future.set_result(None)
+            else:
+                enqueue_job(job_id, row['tweets_text'], key, row['lane'], bool(row['incremental']),
+                            future, row['created_at'])
+                episode_jobs[key] = job_id
+            job_futures[job_id] = future
+
+def job_status_counts() -> dict:
+    """Number of tracked jobs per status, for /metrics"""
+    counts = {(status,): 0 for status in ('queued', 'running', 'done', 'failed')}
+    with jobs_lock:
+        for job in jobs.values():
+            counts[(job['status'],)] += 1
+    return counts
+
+metrics.CallbackGauge("xtune_jobs", "Tracked generation jobs by status",
+                      job_status_counts, labels=("status",))
+# Stores and backends only exist once create_app's core phase has run;
+# until then their gauges are empty
+metrics.CallbackGauge("xtune_episode_store_bytes", "Bytes of indexed episode audio",
+                      lambda: {(): episode_store.total_bytes()} if episode_store else {})
+metrics.CallbackGauge("xtune_tts_cache", "TTS line cache counters and footprint",
+                      lambda: {(k,): v for k, v in tts_cache_summary().items()}, labels=("stat",))
+metrics.CallbackGauge("xtune_tts_backend_healthy", "Whether each TTS backend is taking requests",
+                      lambda: {(b.name,): int(b.healthy) for b in tts_router.backends} if tts_router else {},
+                      labels=("backend",))
+metrics.CallbackGauge("xtune_tts_router", "Hedged requests, hedges that won, and failovers",
+                      lambda: {(k,): v for k, v in tts_router.stats.items()} if tts_router else {},
+                      labels=("stat",))
+metrics.CallbackGauge("xtune_job_events", "Job event listeners, events published and webhook outcomes",
+                      lambda: {('listeners',): event_hub.listener_count(),
+                               **{(k,): v for k, v in event_hub.stats.items()}}, labels=("stat",))
+metrics.CallbackGauge("xtune_segment_scratch_bytes", "Synthesized segments held in memory or spilled to disk",
+                      lambda: {(k,): v for k, v in scratch_bytes.items()}, labels=("where",))
+metrics.CallbackGauge("xtune_startup_seconds", "Time spent in each startup phase",
+                      lambda: {(k,): v for k, v in startup_phases.items()}, labels=("phase",))
+
+def shutdown():
+    """Stop accepting jobs, drain the running ones, then stop the event loop
+
+    Jobs still queued are not run; they stay in the journal and resume
+    when the server restarts.
+    """
+    if shutting_down.is_set():
+        return
+    shutting_down.set()
+    if 'core' not in startup_phases:
+        return
+    print("🛑 Draining in-flight jobs...")
+    job_executor.shutdown(wait=True, cancel_futures=True)
+    while True:
+        try:
+            _, _, job_id, _, _, _, future = job_queue.get_nowait()
+        except queue.Empty:
+            break
+        update_job(job_id, status='failed', error='Server shut down; the job resumes on restart')
+        job_progress[job_id].finish()
+        future.set_result(None)
+    audio_executor.shutdown(wait=True)
+    run_async(event_hub.close())
+    run_async(tts_router.close())
+    event_loop.call_soon_threadsafe(event_loop.stop)
+    job_journal.close()
+    print("👋 All jobs drained")
+
+def job_response(job_id: str, job: dict) -> dict:
+    """Shape a job record like the PodcastfyResponse the iOS app decodes"""
+    response = {
+        'success': job['status'] != 'failed',
+        'jobId': job_id,
+        'status': job['status'],
+        'timestamp': datetime.fromtimestamp(job['updated_at']).isoformat()
+    }
+    for key in ('audioURL', 'duration', 'script', 'renditions', 'error'):
+        if key in job:
+            response[key] = job[key]
+    if job['status'] in ('queued', 'running'):
+        response['streamURL'] = f"http://localhost:5001/stream/{job_id}"
+        if event_hub.runner is not None:
+            response['eventsURL'] = f"http://localhost:{EVENTS_PORT}/events/{job_id}"
+    return response
+
+def stream_episode(progress: EpisodeProgress):
+    """Yield an episode's MP3 frames in script order as segments finish
+
+    The stream holds the episode's segment buffer until it has sent every
+    segment, so it carries the audio as synthesized (before any
+    post-processing). If the episode finished before the stream started,
+    the finished file is sent instead.
+    """
+    with progress.condition:
+        progress.condition.wait_for(lambda: progress.finished or progress.segments is not None)
+        scratch = progress.segments
+    retained = scratch is not None and scratch.retain()
+
+    sent = 0
+    index = 0
+    try:
+        while retained:
+            audio = progress.wait_for_segment(index)
+            if audio is None:
+                break
+            scan = scan_mp3_frames(audio)
+            if not scan:
+                break
+            chunk = extract_mp3_frames(audio, scan[1])
+            yield chunk
+            sent += len(chunk)
+            index += 1
+    finally:
+        if retained:
+            scratch.release()
+
+    if sent:
+        # Streamed from the segments: either all of them, or the episode failed
+        return
+    with progress.condition:
+        progress.condition.wait_for(lambda: progress.finished)
+    if not progress.output_path.exists():
+        return
+    with open(progress.output_path, "rb") as episode:
+        while chunk := episode.read(64 * 1024):
+            yield chunk
+
+# --- Pre-generation Scheduler ---
+# slot -> id of the job that pre-generated its current episode
+slot_jobs = {}
+
+def next_publish_time(after: datetime):
+    """The first (slot, publish datetime) strictly after `after`"""
+    local = after.astimezone(PUBLISH_TIMEZONE)
+    candidates = []
+    for slot, hour in PUBLISH_SLOTS.items():
+        publish = local.replace(hour=hour, minute=0, second=0, microsecond=0)
+        if publish <= local:
+            publish += timedelta(days=1)
+        candidates.append((publish, slot))
+    publish, slot = min(candidates)
+    return slot, publish
+
+def pregenerate_slot(slot: str):
+    """Queue the episode for a slot from its source file, returning the job id"""
+    source = Path(PREGEN_SOURCE_DIR) / f"{slot}.txt"
+    try:
+        tweets_text = source.read_text().strip()
+    except OSError as e:
+        print(f"⚠️  No pre-generation input for {slot}: {e}")
+        return None
+    if not tweets_text:
+        print(f"⚠️  Pre-generation input for {slot} is empty")
+        return None
+
+    print(f"🌅 Pre-generating {slot} episode")
+    # Slot inputs are refreshed through the day; only changed tweets re-render
+    job_id, future = submit_job(tweets_text, lane='scheduled', incremental=True)
+    slot_jobs[slot] = job_id
+    # Catch the slot's listeners up with the job they now follow
+    publish_job_state(job_id, get_job(job_id))
+    future.add_done_callback(lambda _: record_slot_episode(slot, job_id))
+    return job_id
+
+def record_slot_episode(slot: str, job_id: str):
+    """Serve a slot's finished episode from the episode store from now on
+
+    Job records are pruned after JOB_RETENTION_SECONDS; the slot has to
+    keep serving its episode until the next pre-generation run.
+    """
+    job = get_job(job_id)
+    if job and job['status'] == 'done':
+        episode_store.set_slot(slot, job['episode_key'])
+
+def pregeneration_loop():
+    """Build each slot's episode ahead of its publish time
+
+    Start times are jittered so several servers don't all hit edge-tts at
+    once, and a run waits while live requests are queued for the job
+    workers, until PREGEN_DEADLINE_SECONDS before the publish time. Jobs go
+    in the scheduled lane, so past that deadline they run ahead of any
+    ad-hoc requests still waiting.
+    """
+    now = datetime.now(PUBLISH_TIMEZONE)
+    while not shutting_down.is_set():
+        slot, publish = next_publish_time(now)
+        lead = PREGEN_LEAD_SECONDS + random.uniform(-PREGEN_JITTER_SECONDS, PREGEN_JITTER_SECONDS)
+        # In UTC: arithmetic on datetimes sharing a ZoneInfo uses wall-clock
+        # time, which is an hour off across a DST change
+        start = publish.astimezone(timezone.utc) - timedelta(seconds=max(lead, 0))
+        wait = (start - datetime.now(timezone.utc)).total_seconds()
+        if shutting_down.wait(max(wait, 0)):
+            return
+
+        deadline = publish.astimezone(timezone.utc) - timedelta(seconds=PREGEN_DEADLINE_SECONDS)
+        while (remaining := (deadline - datetime.now(timezone.utc)).total_seconds()) > 0:
+            with jobs_lock:
+                if not queued_job_count():
+                    break
+            if shutting_down.wait(min(remaining, 5)):
+                return
+        pregenerate_slot(slot)
+        now = publish
+
+def start_pregeneration():
+    """Start the pre-generation thread if a source directory is configured"""
+    if not PREGEN_SOURCE_DIR:
+        return
+    print(f"⏰ Pre-generating {', '.join(PUBLISH_SLOTS)} episodes from {PREGEN_SOURCE_DIR}")
+    threading.Thread(target=pregeneration_loop, name="xtune-pregen", daemon=True).start()
+
+# --- Startup ---
+# Seconds spent per phase: import (this module), core (before serving) and
+# warm (in the background; /ready answers 200 once it's done)
+startup_phases = {'import': time.perf_counter() - IMPORT_STARTED}
+startup_lock = threading.Lock()
+ready = threading.Event()
+
+def start_core():
+    """Open storage, fork the audio workers and start the event loop and TTS backends"""
+    global episode_store, audio_executor, tts_router, job_journal, POSTPROCESS
+    OUTPUT_DIR.mkdir(exist_ok=True)
+    TTS_CACHE_DIR.mkdir(exist_ok=True)
+    cleanup_temp_files()
+    episode_store = EpisodeStore(OUTPUT_DIR, EPISODE_QUOTA_BYTES, EPISODE_TTL_SECONDS)
+    episode_store.adopt_untracked()
+    episode_store.enforce()
+
+    audio_executor = start_audio_workers()
+    if POSTPROCESS and not postprocess_available():
+        print("⚠️  Post-processing needs numpy and ffmpeg; stitching segments as synthesized")
+        POSTPROCESS = False
+
+    threading.Thread(target=event_loop.run_forever, name="xtune-loop", daemon=True).start()
+    tts_router = TTSRouter(
+        [backend for backend in map(build_tts_backend, TTS_BACKENDS) if backend],
+        TTS_HEDGE_FACTOR, TTS_HEDGE_MIN_SECONDS
+    )
+    job_journal = JobJournal(OUTPUT_DIR / "jobs.db")
+
+def warm_up():
+    """Background phase: index the TTS cache and warm the backends, then resume work
+
+    Warming loads edge-tts and opens a session per host voice, so the first
+    episode doesn't pay for either.
+    """
+    start = time.perf_counter()
+    try:
+        load_tts_cache_index()
+        try:
+            run_async(asyncio.wait_for(tts_router.warm(list(HOST_VOICES.values())),
+                                       WARM_TIMEOUT_SECONDS))
+        except asyncio.TimeoutError:
+            print(f"⚠️  TTS backends not warm after {WARM_TIMEOUT_SECONDS}s; going ahead cold")
+        if EVENTS_PORT:
+            try:
+                run_async(event_hub.start("0.0.0.0", EVENTS_PORT))
+                print(f"📡 Job events on port {EVENTS_PORT}")
+            except OSError as e:
+                print(f"⚠️  Job events disabled: {e}")
+        resume_jobs()
+        start_pregeneration()
+    finally:
+        startup_phases['warm'] = time.perf_counter() - start
+        ready.set()
+    print(f"🟢 Ready (import {startup_phases['import']:.2f}s, core {startup_phases['core']:.2f}s, "
+          f"warm {startup_phases['warm']:.2f}s)")
+
+def create_app():
+    """Start the server and return its Flask app; later calls just return the app
+
+    Requests (and /health) are served as soon as the core phase is done;
+    the warm phase runs in the background and /ready reports when it has
+    finished. For gunicorn: 'simple_tts_server:create_app()'.
+    """
+    with startup_lock:
+        if 'core' in startup_phases:
+            return app
+        if startup_phases['import'] > IMPORT_BUDGET_SECONDS:
+            print(f"🐢 Import took {startup_phases['import']:.2f}s, over the "
+                  f"{IMPORT_BUDGET_SECONDS}s budget")
+        start = time.perf_counter()
+        start_core()
+        startup_phases['core'] = time.perf_counter() - start
+    threading.Thread(target=warm_up, name="xtune-warm", daemon=True).start()
+    return app
 
 # --- Flask Routes ---
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint; 'starting' until create_app's core phase has run"""
+    if tts_router is None:
+        return jsonify({
+            'status': 'starting',
+            'timestamp': datetime.now().isoformat(),
+            'service': 'XTune TTS Server'
+        })
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'service': 'XTune TTS Server'
+        'service': 'XTune TTS Server',
+        'ttsCache': tts_cache_summary(),
+        'ttsBackends': tts_router.summary()
     })
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 200 once warmed up, 503 while starting, draining or without audio workers"""
+    is_ready = ready.is_set() and not shutting_down.is_set() and not audio_workers_broken.is_set()
+    response = jsonify({'ready': is_ready, 'startup': startup_phases})
+    response.status_code = 200 if is_ready else 503
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/generate-podcast', methods=['POST'])
 def generate_podcast():
-    """Generate podcast from tweet content"""
-    with audio_generation_lock:
+    """Generate podcast from tweet content
+
+    Pass "async": true in the body (or ?async=1) to get a job id back
+    immediately, then follow its eventsURL (server-sent progress events)
+    or poll /status/<job_id> for the result. With
+    "incremental": true (or ?incremental=1) the episode is built from
+    per-tweet blocks, and only blocks whose tweets changed are re-rendered.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Invalid JSON'}), 400
+
+        tweets_text = data.get('text', '')
+        if not tweets_text:
+            return jsonify({'error': 'No text provided'}), 400
+        if not isinstance(tweets_text, str):
+            return jsonify({'error': 'Text must be a string'}), 400
+
+        if shutting_down.is_set():
+            return jsonify({'success': False, 'error': 'Server is shutting down'}), 503
+
+        print("🎙️  Received request to generate podcast")
         try:
-            data = request.get_json()
-            if not data:
-                return jsonify({'error': 'Invalid JSON'}), 400
-            
-            tweets_text = data.get('text', '')
-            if not tweets_text:
-                return jsonify({'error': 'No text provided'}), 400
-
-            print("🎙️  Received request to generate podcast")
-            
-            # Generate script
-            script = generate_podcast_script(tweets_text)
-            
-            # Generate audio
-            episode_id = uuid.uuid4()
-            output_filename = f"episode_{episode_id}.mp3"
-            output_path = OUTPUT_DIR / output_filename
-            
-            duration = asyncio.run(generate_and_stitch_audio(script, output_path))
-            
-            if duration > 0:
-                audio_url = f"http://localhost:5001/audio/{output_filename}"
-                return jsonify({
-                    'success': True,
-                    'audioURL': audio_url,
-                    'duration': duration,
-                    'script': script
-                })
-            else:
-                return jsonify({'success': False, 'error': 'Audio generation failed'}), 500
+            incremental = bool(data.get('incremental')) or request.args.get('incremental') == '1'
+            job_id, future = submit_job(tweets_text, incremental=incremental, client=request.remote_addr)
+        except AdmissionRejected as e:
+            print(f"🚦 Refused podcast request: {e}")
+            return rejection_response(e)
 
-        except Exception as e:
-            print(f"Error in generate_podcast: {e}")
-            return jsonify({'success': False, 'error': str(e)}), 500
+        if data.get('async') or request.args.get('async') == '1':
+            return jsonify(job_response(job_id, get_job(job_id))), 202
+
+        # Synchronous mode: wait for the worker pool to finish this job
+        future.result()
+        job = get_job(job_id)
+        if job['status'] == 'done':
+            return jsonify(job_response(job_id, job))
+        return jsonify({'success': False, 'error': 'Audio generation failed'}), 500
+
+    except Exception as e:
+        print(f"Error in generate_podcast: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/generate-batch', methods=['POST'])
+def generate_batch():
+    """Generate several episodes (e.g. a region's three daily slots) in one call
+
+    Body: {"items": [{"id": "morning", "text": "..."}, ...]}. All items are
+    queued at once and share the event loop, TTS cache and episode dedup.
+    The response streams one JSON line per item as it finishes; with
+    "async": true it returns the job ids immediately instead. "incremental"
+    works as for /generate-podcast.
+    """
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'No items provided'}), 400
+    if len(items) > MAX_BATCH_ITEMS:
+        return jsonify({'error': f'At most {MAX_BATCH_ITEMS} items per batch'}), 400
+    if not all(isinstance(item, dict) and item.get('text') and isinstance(item['text'], str)
+               for item in items):
+        return jsonify({'error': 'Every item needs a text string'}), 400
+    if shutting_down.is_set():
+        return jsonify({'success': False, 'error': 'Server is shutting down'}), 503
+
+    print(f"🎙️  Received batch of {len(items)} podcasts")
+    # Identical items coalesce onto one job, so map each future to its items
+    submitted = []
+    items_by_future = {}
+    incremental = bool(data.get('incremental')) or request.args.get('incremental') == '1'
+    try:
+        # Refuse up front rather than queue part of the batch
+        with jobs_lock:
+            check_queue_capacity(len(items))
+        for index, item in enumerate(items):
+            item_id = item.get('id', index)
+            job_id, future = submit_job(item['text'], lane='batch', incremental=incremental,
+                                        client=request.remote_addr)
+            submitted.append((item_id, job_id))
+            items_by_future.setdefault(future, []).append((item_id, job_id))
+    except AdmissionRejected as e:
+        # Items queued before a concurrent request filled the queue (or the
+        # client ran out of tokens) keep running; a retry joins them for free
+        print(f"🚦 Refused batch: {e}")
+        return rejection_response(e)
+
+    if data.get('async') or request.args.get('async') == '1':
+        return jsonify({'items': [
+            {'id': item_id, **job_response(job_id, get_job(job_id))}
+            for item_id, job_id in submitted
+        ]}), 202
+
+    def results():
+        for future in as_completed(items_by_future):
+            for item_id, job_id in items_by_future[future]:
+                yield json.dumps({'id': item_id, **job_response(job_id, get_job(job_id))}) + "\n"
+
+    return Response(stream_with_context(results()), mimetype='application/x-ndjson')
+
+@app.route('/status/<job_id>')
+def job_status(job_id):
+    """Report queued/running/done/failed for a generation job"""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify(job_response(job_id, job))
+
+@app.route('/slots/<slot>')
+def slot_episode(slot):
+    """The pre-generated episode for a publish slot (morning/midday/evening)
+
+    slotEventsURL streams the slot's job events, today's and every later one.
+    """
+    if slot not in PUBLISH_SLOTS:
+        return jsonify({'success': False, 'error': 'Unknown slot'}), 404
+    events = {}
+    if event_hub.runner is not None:
+        events['slotEventsURL'] = f"http://localhost:{EVENTS_PORT}/events/slots/{slot}"
+    job_id = slot_jobs.get(slot)
+    job = get_job(job_id) if job_id else None
+    if job and job['status'] in ('queued', 'running'):
+        return jsonify({**job_response(job_id, job), **events})
+    key = episode_store.get_slot(slot)
+    result = load_episode(key) if key else None
+    if not result:
+        return jsonify({'success': False, 'error': 'Slot not pre-generated yet', **events}), 404
+    return jsonify({'success': True, 'status': 'done',
+                    'timestamp': datetime.now().isoformat(), **result, **events})
+
+@app.route('/stream/<job_id>')
+def stream_audio(job_id):
+    """Stream an episode as chunked MP3 while it is still being generated"""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] == 'failed':
+        return jsonify({'error': job.get('error', 'Audio generation failed')}), 500
+    if job['status'] == 'done':
+        return serve_audio(f"episode_{job['episode_key']}.mp3")
+
+    progress = job_progress.get(job_id)
+    if not progress:
+        return jsonify({'error': 'Job not found'}), 404
+    return Response(stream_with_context(stream_episode(progress)), mimetype='audio/mpeg')
+
+# path -> (mtime_ns, size, etag), so each file is hashed once; least
+# recently served first, and evicted episodes age out of it
+AUDIO_ETAG_CACHE_SIZE = 4096
+audio_etags = OrderedDict()
+audio_etags_lock = threading.Lock()
+
+def audio_etag(path: Path) -> str:
+    """Strong ETag derived from the file's content hash"""
+    stat = path.stat()
+    with audio_etags_lock:
+        cached = audio_etags.get(path)
+        if cached:
+            audio_etags.move_to_end(path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    etag = digest.hexdigest()[:32]
+    with audio_etags_lock:
+        audio_etags[path] = (stat.st_mtime_ns, stat.st_size, etag)
+        audio_etags.move_to_end(path)
+        while len(audio_etags) > AUDIO_ETAG_CACHE_SIZE:
+            audio_etags.popitem(last=False)
+    return etag
+
+def audio_mimetype(filename: str) -> str:
+    """Content type of an episode file or rendition, by its suffix"""
+    for profile in sorted(OUTPUT_PROFILES.values(), key=lambda p: -len(p['suffix'])):
+        if filename.endswith(profile['suffix']):
+            return profile['mimetype']
+    return 'audio/mpeg'
+
+def negotiate_rendition(filename: str) -> str:
+    """Pick which rendition of an episode to serve for the current request
+
+    An explicit ?profile= wins, then Save-Data: on selects the mobile MP3,
+    then the Accept header chooses between content types. Clients that
+    accept anything get the original MP3.
+    """
+    available = {'mp3': filename}
+    for name in OUTPUT_RENDITIONS:
+        rendition = rendition_filename(filename, name)
+        if name != 'hls' and (OUTPUT_DIR / rendition).is_file():
+            available[name] = rendition
+
+    profile = request.args.get('profile')
+    if profile in available:
+        return available[profile]
+    if 'mobile' in available and request.headers.get('Save-Data', '').lower() == 'on':
+        return available['mobile']
+
+    # First profile per content type; the original MP3 comes first
+    by_mimetype = {}
+    for name in available:
+        by_mimetype.setdefault(OUTPUT_PROFILES[name]['mimetype'], name)
+    best = request.accept_mimetypes.best_match(list(by_mimetype), default='audio/mpeg')
+    return available[by_mimetype[best]]
+
+def is_episode_file(filename: str) -> bool:
+    """Whether a name is an episode's MP3 or a single-file rendition of it
+
+    Only these are served from OUTPUT_DIR, which also holds the episode
+    index, the job journal and their lock files.
+    """
+    match = re.fullmatch(r"episode_[0-9a-f-]+(\..+)", filename)
+    return bool(match) and any(match.group(1) == profile['suffix']
+                               for name, profile in OUTPUT_PROFILES.items() if name != 'hls')
 
 @app.route('/audio/<filename>')
 def serve_audio(filename):
-    """Serve audio files"""
+    """Serve episode audio with Range, ETag and Last-Modified support
+
+    Requests for an episode's MP3 are content-negotiated across its
+    renditions; each rendition is also addressable by its own name.
+    """
     path = OUTPUT_DIR / filename
-    if path.exists():
-        return send_file(path, mimetype='audio/mpeg')
-    return jsonify({'error': 'Audio file not found'}), 404
+    if not is_episode_file(filename) or not path.is_file():
+        return jsonify({'error': 'Audio file not found'}), 404
+    negotiated = filename.count(".") == 1 and filename.endswith(".mp3")
+    if negotiated:
+        filename = negotiate_rendition(filename)
+        path = OUTPUT_DIR / filename
+
+    # send_file answers Range requests with 206 and If-None-Match /
+    # If-Modified-Since with 304; the WSGI server's file_wrapper (or
+    # X-Sendfile) sends the body without copying it through Python
+    response = send_file(
+        path.resolve(),
+        mimetype=audio_mimetype(filename),
+        conditional=True,
+        etag=audio_etag(path),
+        max_age=AUDIO_CACHE_MAX_AGE
+    )
+    episode_store.touch(filename.split(".")[0] + ".mp3")
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    if negotiated:
+        response.vary.update(('Accept', 'Save-Data'))
+    return response
+
+@app.route('/audio/<filename>/<segment>')
+def serve_hls(filename, segment):
+    """Serve the playlist and segments of an episode's HLS rendition"""
+    if not re.fullmatch(r"episode_[0-9a-f-]+" + re.escape(OUTPUT_PROFILES['hls']['suffix']), filename):
+        return jsonify({'error': 'Audio file not found'}), 404
+    mimetype = OUTPUT_PROFILES['hls']['mimetype'] if segment.endswith(".m3u8") else 'video/mp2t'
+    # send_from_directory rejects paths that escape the rendition directory
+    response = send_from_directory((OUTPUT_DIR / filename).resolve(), segment, mimetype=mimetype,
+                                   conditional=True, max_age=AUDIO_CACHE_MAX_AGE)
+    episode_store.touch(filename.split(".")[0] + ".mp3")
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response
 
 @app.route('/list-audio')
 def list_audio():
-    """List all available audio files"""
+    """List episodes newest first, paginated with ?limit=&offset="""
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    rows, total = episode_store.page(limit, offset)
     audio_files = [
-        {'filename': f.name, 'size': f.stat().st_size}
-        for f in OUTPUT_DIR.glob("episode_*.mp3")
+        {
+            'filename': row['filename'],
+            'size': row['size'],
+            'duration': row['duration'],
+            'createdAt': datetime.fromtimestamp(row['created_at']).isoformat()
+        }
+        for row in rows
     ]
-    return jsonify({'files': audio_files})
+    return jsonify({'files': audio_files, 'count': total, 'limit': limit, 'offset': offset})
 
 if __name__ == '__main__':
+    # Development server; in production run: gunicorn -c gunicorn.conf.py 'simple_tts_server:create_app()'
     print("🚀 Starting XTune TTS Server...")
-    app.run(host='0.0.0.0', port=5001, debug=True) 
\ No newline at end of file
+    # The debug reloader re-runs this file in a child process that serves
+    # requests (with WERKZEUG_RUN_MAIN set); only that one starts the server
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        create_app()
+    app.run(host='0.0.0.0', port=5001, debug=True)
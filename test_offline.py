@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Offline checks for the XTune TTS server's pure logic
+
+Unlike the other test scripts these need no running server: run this file
+directly, or with pytest.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+# The server reads its configuration at import: fake TTS, no events port
+os.environ.setdefault("XTUNE_TTS_BACKENDS", "fake")
+os.environ.setdefault("XTUNE_EVENTS_PORT", "0")
+
+import simple_tts_server as server
+from audio_processing import concat_mp3_frames, parse_mp3_header, scan_mp3_frames
+from job_journal import JobJournal
+
+# MPEG-2 Layer III, 48 kbps, 24 kHz, mono (what edge-tts returns): 144 byte frames
+EDGE_HEADER = bytes([0xFF, 0xF3, 0x64, 0xC0])
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, joint stereo: 417 byte frames
+CD_HEADER = bytes([0xFF, 0xFB, 0x90, 0x40])
+
+def mp3_frames(header: bytes, count: int) -> bytes:
+    """`count` silent frames with the given header"""
+    frame_length = parse_mp3_header(header)[3]
+    return (header + bytes(frame_length - 4)) * count
+
+def id3_tag(size: int) -> bytes:
+    """An ID3v2 tag with `size` bytes of (empty) frames"""
+    syncsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b"ID3\x04\x00\x00" + syncsafe + bytes(size)
+
+def test_mp3_frames():
+    """Frame scanning skips tags and Xing frames, and rejects mixed or broken data"""
+    print("1. Testing MP3 frame scanning...")
+    assert parse_mp3_header(EDGE_HEADER) == (2, 24000, 1, 144, 576)
+    assert parse_mp3_header(CD_HEADER) == (3, 44100, 2, 417, 1152)
+    assert parse_mp3_header(b"\xFF\xF3\xF4\xC0") is None  # bitrate index 15
+    assert parse_mp3_header(b"RIFF") is None
+
+    params, spans, samples = scan_mp3_frames(mp3_frames(EDGE_HEADER, 3))
+    assert params == (2, 24000, 1)
+    assert spans == [(0, 144), (144, 144), (288, 144)]
+    assert samples == 3 * 576
+
+    # ID3v2 in front and ID3v1 behind are not audio
+    tagged = id3_tag(50) + mp3_frames(EDGE_HEADER, 2) + b"TAG" + bytes(125)
+    assert scan_mp3_frames(tagged)[1] == [(60, 144), (204, 144)]
+
+    # A leading Xing frame only describes its own file
+    xing = EDGE_HEADER + bytes(32) + b"Xing" + bytes(104)
+    assert scan_mp3_frames(xing + mp3_frames(EDGE_HEADER, 2))[1] == [(144, 144), (288, 144)]
+
+    assert scan_mp3_frames(mp3_frames(EDGE_HEADER, 2) + mp3_frames(CD_HEADER, 1)) is None
+    assert scan_mp3_frames(mp3_frames(EDGE_HEADER, 2) + b"junk") is None
+    assert scan_mp3_frames(id3_tag(20)) is None
+    print("✅ Frame scanning OK")
+
+def test_concat_mp3_frames():
+    """Segments with matching codec parameters are joined frame by frame"""
+    print("2. Testing frame-by-frame concatenation...")
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "episode.mp3"
+        segments = [id3_tag(10) + mp3_frames(EDGE_HEADER, 2), mp3_frames(EDGE_HEADER, 3)]
+        duration = concat_mp3_frames(segments, output)
+        assert output.read_bytes() == mp3_frames(EDGE_HEADER, 5)
+        assert abs(duration - 5 * 576 / 24000) < 1e-9
+
+        mixed = Path(tmp) / "mixed.mp3"
+        assert concat_mp3_frames([mp3_frames(EDGE_HEADER, 1), mp3_frames(CD_HEADER, 1)], mixed) == 0.0
+        assert not mixed.exists()
+        assert concat_mp3_frames([], mixed) == 0.0
+    print("✅ Concatenation OK")
+
+def test_plan_synthesis():
+    """Lines are split at sentences and merged per host, never across blocks"""
+    print("3. Testing synthesis planning...")
+    chunks = server.split_sentences("One two. Three four five. Six.", 12)
+    assert chunks == ["One two.", "Three four", "five. Six."]
+    assert server.split_sentences("abcdefghijkl", 5) == ["abcde", "fghij", "kl"]
+    assert server.split_sentences("Short.", 100) == ["Short."]
+
+    guy, aria = server.HOST_VOICES["Ant"], server.HOST_VOICES["Dawn"]
+    script = ("Ant: Hello   there.\nAnt: Second line.\nDawn: Hi.\nNarrator: Not a host.\n"
+              "Dawn:\nno speaker\n\nDawn: New block.")
+    assert server.plan_synthesis(script) == [
+        [guy, "Hello there.\nSecond line."],
+        [aria, "Hi."],
+        [aria, "New block."],
+    ]
+
+    max_chars = server.TTS_BATCH_MAX_CHARS
+    server.TTS_BATCH_MAX_CHARS = 20
+    try:
+        segments = server.plan_synthesis("Ant: One two three. Four five six seven.\nAnt: Eight.")
+    finally:
+        server.TTS_BATCH_MAX_CHARS = max_chars
+    assert all(len(text) <= 20 for _, text in segments)
+    assert " ".join(text.replace("\n", " ") for _, text in segments) == \
+        "One two three. Four five six seven. Eight."
+    print("✅ Synthesis planning OK")
+
+def test_token_bucket():
+    """Buckets refill at their rate up to capacity; a refused take costs nothing"""
+    print("4. Testing the rate limit token bucket...")
+    bucket = server.TokenBucket(rate=1.0, capacity=2)
+    assert bucket.take(1) == 0.0
+    assert bucket.take(1) == 0.0
+    wait = bucket.take(1)
+    assert 0.9 < wait <= 1.0
+    bucket.updated -= 0.5  # half a second passes
+    assert 0.4 < bucket.take(1) <= 0.5
+    bucket.updated -= 10
+    bucket.refill()
+    assert bucket.tokens == 2
+    # A cost over the capacity is capped, so it can still be paid
+    assert bucket.take(5) == 0.0 and bucket.tokens == 0
+    print("✅ Token bucket OK")
+
+def test_claim_orphans():
+    """Only jobs of dead owners are claimed, and each by exactly one journal"""
+    print("5. Testing job journal takeover...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "jobs.db"
+        first = JobJournal(path)
+        first.add("job-1", "key-1", "tweets", False, "interactive", 1.0)
+        first.set_script("job-1", "Ant: Hi.")
+        second = JobJournal(path)
+        assert second.claim_orphans() == []  # its owner is alive
+
+        first.close()
+        claimed = second.claim_orphans()
+        assert [row['job_id'] for row in claimed] == ["job-1"]
+        assert second.script("job-1") == "Ant: Hi."
+        third = JobJournal(path)
+        assert third.claim_orphans() == []  # second owns it now
+
+        # Compare-and-set: a journal that saw the old owner loses the race
+        second.close()
+        fourth = JobJournal(path)
+        owner_alive = third.owner_alive
+        raced = []
+
+        def racing_owner_alive(owner):
+            alive = owner_alive(owner)
+            # fourth takes the job between third's read and its update
+            raced.extend(row['job_id'] for row in fourth.claim_orphans())
+            return alive
+        third.owner_alive = racing_owner_alive
+        assert third.claim_orphans() == []
+        assert raced == ["job-1"]
+
+        fourth.finish("job-1")
+        fourth.close()
+        assert third.claim_orphans() == []
+        third.close()
+    print("✅ Job journal takeover OK")
+
+def test_admission_control():
+    """Through the Flask test client on FakeBackend: joins are free, new episodes spend the burst"""
+    print("6. Testing admission control end to end...")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            client = server.create_app().test_client()
+            assert server.ready.wait(30)
+            assert [backend.name for backend in server.tts_router.backends] == ["fake"]
+            burst = server.RATE_LIMIT_BURST
+
+            # Every device behind one NAT asks for the same episode
+            codes = [client.post('/generate-podcast', json={'text': 'Same tweets'}).status_code
+                     for _ in range(burst + 2)]
+            assert codes == [200] * (burst + 2)
+
+            # New episodes spend the rest of the burst
+            codes = [client.post('/generate-podcast', json={'text': f'Tweet {i}', 'async': True}).status_code
+                     for i in range(burst)]
+            assert codes == [202] * (burst - 1) + [429]
+            refused = client.post('/generate-podcast', json={'text': 'One more', 'async': True})
+            assert refused.status_code == 429 and int(refused.headers['Retry-After']) >= 1
+            # ...but joining or reusing an episode still works
+            assert client.post('/generate-podcast', json={'text': 'Tweet 0', 'async': True}).status_code == 202
+
+            assert client.post('/generate-batch', json={'items': [{'text': 5}]}).status_code == 400
+            assert server.tts_router.backends[0].calls > 0
+        finally:
+            server.shutdown()
+            os.chdir(cwd)
+    print("✅ Admission control OK")
+
+if __name__ == "__main__":
+    print("🧪 Running offline checks...")
+    print("=" * 50)
+    for test in [test_mp3_frames, test_concat_mp3_frames, test_plan_synthesis, test_token_bucket,
+                 test_claim_orphans, test_admission_control]:
+        test()
+    print("=" * 50)
+    print("🎉 All offline checks PASSED!")
@@ -0,0 +1,305 @@
+"""
+Pluggable speech synthesis backends for the XTune TTS server
+
+Each backend turns lines of text into MP3 bytes for a voice, under its
+own concurrency limit. TTSRouter prefers healthy backends in configured
+order, fails over when one errors, and hedges: a request running well
+past its backend's usual latency is also sent to the next backend, and
+whichever answers first wins.
+"""
+
+import asyncio
+import random
+import shutil
+import time
+from xml.sax.saxutils import escape
+
+from pydub import AudioSegment
+
+# Silent MPEG-2 Layer III frame (24 kHz, 48 kbps, mono), the format edge-tts returns
+SILENT_MP3_FRAME = bytes([0xFF, 0xF3, 0x64, 0xC0]) + bytes(140)
+SILENT_FRAME_SECONDS = 576 / 24000
+# Roughly how fast the hosts speak, used to size canned audio
+FAKE_CHARS_PER_SECOND = 15
+
+# A backend failing this many requests in a row is skipped for a while
+FAILURE_THRESHOLD = 3
+COOLDOWN_SECONDS = 30
+
+
+async def run_process(args, input: bytes = None) -> bytes:
+    """Run a command, returning its stdout; the process is killed if we're cancelled"""
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await process.communicate(input)
+    except asyncio.CancelledError:
+        process.kill()
+        raise
+    if process.returncode != 0:
+        raise RuntimeError(f"{args[0]} exited with {process.returncode}: {stderr.decode(errors='replace')[:200]}")
+    return stdout
+
+
+class TTSBackend:
+    """Base backend: concurrency limit plus health and latency tracking
+
+    Subclasses implement render(lines, voice).
+    """
+
+    name = "backend"
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.slots = asyncio.Semaphore(concurrency)
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+        self.seconds_per_char = None  # moving average of render time
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    async def synthesize(self, lines, voice: str) -> bytes:
+        """Render lines under the concurrency limit, recording latency and failures"""
+        async with self.slots:
+            start = time.monotonic()
+            try:
+                audio = await self.render(lines, voice)
+                if not audio:
+                    raise ValueError("No audio received")
+            except Exception:
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= FAILURE_THRESHOLD and self.healthy:
+                    print(f"🩺 TTS backend {self.name} failing, skipping it for {COOLDOWN_SECONDS}s")
+                    self.down_until = time.monotonic() + COOLDOWN_SECONDS
+                raise
+            rate = (time.monotonic() - start) / max(sum(len(line) for line in lines), 1)
+            self.seconds_per_char = rate if self.seconds_per_char is None else (
+                0.8 * self.seconds_per_char + 0.2 * rate)
+            self.consecutive_failures = 0
+            self.down_until = 0.0
+            return audio
+
+    async def render(self, lines, voice: str) -> bytes:
+        raise NotImplementedError
+
+    def check(self):
+        """Why this backend can't run here, or None if it can"""
+        return None
+
+    async def warm(self, voices):
+        """Get ready to serve these voices before the first request"""
+
+    async def close(self):
+        pass
+
+    def summary(self) -> dict:
+        return {
+            'healthy': self.healthy,
+            'concurrency': self.concurrency,
+            'consecutiveFailures': self.consecutive_failures,
+            'secondsPerChar': self.seconds_per_char,
+        }
+
+
+class EdgeBackend(TTSBackend):
+    """Microsoft Edge read-aloud voices over pooled websockets"""
+
+    name = "edge"
+
+    def __init__(self, concurrency: int, pool):
+        super().__init__(concurrency)
+        self.pool = pool
+
+    async def render(self, lines, voice: str) -> bytes:
+        return await self.pool.synthesize(voice, lines)
+
+    def check(self):
+        return self.pool.check()
+
+    async def warm(self, voices):
+        await self.pool.warm(voices)
+
+    async def close(self):
+        await self.pool.close()
+
+
+class EdgeOneShotBackend(TTSBackend):
+    """The same voices through edge-tts's public API, one connection per line
+
+    The fallback for when the pool fails. The public API takes plain text,
+    so the pauses between lines are silent frames rather than SSML breaks;
+    its own name keeps that audio out of the TTS cache, which holds the
+    pooled backend's renditions.
+    """
+
+    name = "edge-oneshot"
+
+    def __init__(self, concurrency: int, settings: dict, break_ms: int):
+        super().__init__(concurrency)
+        self.settings = settings
+        self.break_ms = break_ms
+
+    async def render(self, lines, voice: str) -> bytes:
+        import edge_tts
+
+        parts = []
+        for line in lines:
+            communicate = edge_tts.Communicate(line, voice, **self.settings)
+            parts.append(b"".join([chunk["data"] async for chunk in communicate.stream()
+                                   if chunk["type"] == "audio"]))
+        pause = SILENT_MP3_FRAME * round(self.break_ms / 1000 / SILENT_FRAME_SECONDS)
+        return pause.join(parts)
+
+
+class LocalBackend(TTSBackend):
+    """Offline espeak-ng voices, encoded to the MP3 format edge-tts returns
+
+    Matching edge-tts's 24 kHz / 48 kbps mono keeps mixed episodes on the
+    frame-concatenation stitch path.
+    """
+
+    name = "local"
+
+    def __init__(self, concurrency: int, voices: dict, break_ms: int):
+        super().__init__(concurrency)
+        self.voices = voices
+        self.break_ms = break_ms
+        self.command = shutil.which("espeak-ng") or shutil.which("espeak")
+
+    @property
+    def available(self) -> bool:
+        return bool(self.command and shutil.which(AudioSegment.converter))
+
+    async def render(self, lines, voice: str) -> bytes:
+        ssml = "<speak>" + f"<break time='{self.break_ms}ms'/>".join(escape(line) for line in lines) + "</speak>"
+        wav = await run_process([self.command, "-m", "-v", self.voices.get(voice, "en-us"), "--stdout", ssml])
+        return await run_process([
+            AudioSegment.converter, "-loglevel", "error", "-f", "wav", "-i", "pipe:0",
+            "-ac", "1", "-ar", "24000", "-c:a", "libmp3lame", "-b:a", "48k", "-f", "mp3", "pipe:1",
+        ], input=wav)
+
+
+class FakeBackend(TTSBackend):
+    """Canned silent audio with tunable latency and failures, for tests and benchmarks"""
+
+    name = "fake"
+
+    def __init__(self, concurrency: int = 64, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, failure_rate: float = 0.0):
+        super().__init__(concurrency)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+
+    async def render(self, lines, voice: str) -> bytes:
+        self.calls += 1
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        await asyncio.sleep(max(delay, 0) / 1000.0)
+        if random.random() < self.failure_rate:
+            self.failures += 1
+            raise ConnectionError("Simulated backend failure")
+        seconds = max(sum(len(line) for line in lines) / FAKE_CHARS_PER_SECOND, 0.5)
+        return SILENT_MP3_FRAME * int(seconds / SILENT_FRAME_SECONDS)
+
+
+class TTSRouter:
+    """Sends each request to the best backend, with failover and one hedge
+
+    A request is hedged once it has run hedge_factor times longer than its
+    backend usually takes for that much text (and at least
+    hedge_min_seconds); hedge_factor 0 disables hedging.
+    """
+
+    def __init__(self, backends, hedge_factor: float, hedge_min_seconds: float):
+        self.backends = list(backends)
+        self.hedge_factor = hedge_factor
+        self.hedge_min_seconds = hedge_min_seconds
+        self.stats = {'hedged': 0, 'hedges_won': 0, 'failovers': 0}
+
+    @property
+    def preferred(self) -> str:
+        return self.backends[0].name if self.backends else None
+
+    def candidates(self):
+        """Healthy backends first, each group in configured order"""
+        return sorted(self.backends, key=lambda backend: not backend.healthy)
+
+    def hedge_delay(self, backend: TTSBackend, chars: int):
+        if self.hedge_factor <= 0 or backend.seconds_per_char is None:
+            return None
+        return max(self.hedge_min_seconds, self.hedge_factor * backend.seconds_per_char * chars)
+
+    async def synthesize(self, lines, voice: str):
+        """Synthesize lines, returning (audio, backend name); raises if every backend fails"""
+        candidates = self.candidates()
+        if not candidates:
+            raise RuntimeError("No TTS backends configured")
+        chars = sum(len(line) for line in lines)
+        pending = {}  # task -> backend
+        errors = []
+        hedged = False
+
+        def launch():
+            backend = candidates[len(pending) + len(errors)]
+            pending[asyncio.ensure_future(backend.synthesize(lines, voice))] = backend
+            return backend
+
+        primary = launch()
+        try:
+            while pending:
+                more = len(pending) + len(errors) < len(candidates)
+                timeout = self.hedge_delay(primary, chars) if more and not hedged else None
+                done, _ = await asyncio.wait(pending, timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Slow, not failed: race the next backend against it
+                    hedged = True
+                    self.stats['hedged'] += 1
+                    launch()
+                    continue
+                for task in done:
+                    backend = pending.pop(task)
+                    if task.exception() is None:
+                        if hedged and backend is not primary:
+                            self.stats['hedges_won'] += 1
+                        return task.result(), backend.name
+                    errors.append(f"{backend.name}: {task.exception()}")
+                if not pending and len(errors) < len(candidates):
+                    self.stats['failovers'] += 1
+                    primary = launch()
+            raise RuntimeError("All TTS backends failed (" + "; ".join(errors) + ")")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def warm(self, voices):
+        """Drop backends that can't run here, then warm the rest at once
+
+        A backend that merely fails to warm (say, the network is down) is
+        reported and kept.
+        """
+        for backend in list(self.backends):
+            problem = backend.check()
+            if problem:
+                print(f"⚠️  Disabling TTS backend {backend.name}: {problem}")
+                self.backends.remove(backend)
+        results = await asyncio.gather(*(backend.warm(voices) for backend in self.backends),
+                                       return_exceptions=True)
+        for backend, result in zip(self.backends, results):
+            if isinstance(result, Exception):
+                print(f"⚠️  Could not warm TTS backend {backend.name}: {result}")
+
+    async def close(self):
+        for backend in self.backends:
+            await backend.close()
+
+    def summary(self) -> dict:
+        return {backend.name: backend.summary() for backend in self.backends}
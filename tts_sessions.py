@@ -0,0 +1,225 @@
+"""
+Pooled edge-tts synthesis sessions for the XTune TTS server
+
+edge_tts.Communicate opens a fresh websocket (TLS + auth handshake) for
+every call. EdgeTTSPool keeps warm websockets per voice on the server's
+event loop and sends one SSML request per call over them, so consecutive
+lines from the same host can share a single request with <break/>s
+between them.
+
+aiohttp and edge_tts are imported on first connect rather than with this
+module, so they stay out of the server's import time; EdgeTTSPool.warm
+connects (and so imports them) ahead of the first request.
+
+The handshake uses edge-tts internals (its endpoint constants and DRM
+token helpers), so the pool is pinned to the release it was tested with
+and EdgeTTSPool.check verifies them before it is used.
+"""
+
+import asyncio
+import importlib
+import importlib.metadata
+import time
+import uuid
+from xml.sax.saxutils import escape
+
+# The service drops connections after a while; reconnect before that happens
+SESSION_MAX_AGE_SECONDS = 240
+# Give up on a synthesis request that hasn't finished in this long
+RECEIVE_TIMEOUT_SECONDS = 60
+# edge-tts release the pool was tested against (pip install edge-tts==7.2.8)
+EDGE_TTS_VERSION = "7.2.8"
+# edge-tts internals the handshake needs: (module, attribute path)
+EDGE_TTS_INTERNALS = [
+    ("edge_tts.constants", "SEC_MS_GEC_VERSION"),
+    ("edge_tts.constants", "WSS_HEADERS"),
+    ("edge_tts.constants", "WSS_URL"),
+    ("edge_tts.drm", "DRM.generate_sec_ms_gec"),
+    ("edge_tts.drm", "DRM.headers_with_muid"),
+]
+
+
+def date_to_string() -> str:
+    """Javascript-style UTC timestamp the service expects in X-Timestamp"""
+    return time.strftime("%a %b %d %Y %H:%M:%S GMT+0000 (Coordinated Universal Time)", time.gmtime())
+
+
+def check_edge_tts():
+    """Why the pool can't run with the installed edge-tts, or None if it can"""
+    try:
+        installed = importlib.metadata.version("edge-tts")
+    except importlib.metadata.PackageNotFoundError:
+        return "edge-tts is not installed"
+    missing = []
+    for module_name, path in EDGE_TTS_INTERNALS:
+        try:
+            target = importlib.import_module(module_name)
+            for name in path.split("."):
+                target = getattr(target, name)
+        except (ImportError, AttributeError):
+            missing.append(f"{module_name}.{path}")
+    if missing:
+        return (f"edge-tts {installed} lacks {', '.join(missing)} "
+                f"(the pool was tested with {EDGE_TTS_VERSION})")
+    if installed != EDGE_TTS_VERSION:
+        print(f"⚠️  edge-tts {installed} installed; the session pool was tested with {EDGE_TTS_VERSION}")
+    return None
+
+
+def clean_text(text: str) -> str:
+    """Escape text for SSML, dropping control characters the service rejects"""
+    return escape("".join(" " if ord(ch) < 32 else ch for ch in text))
+
+
+class EdgeTTSSession:
+    """One persistent websocket to the Edge read-aloud service"""
+
+    def __init__(self, voice: str, settings: dict):
+        self.voice = voice
+        self.settings = settings
+        self.session = None
+        self.websocket = None
+        self.opened_at = 0.0
+
+    @property
+    def usable(self) -> bool:
+        return (self.websocket is not None and not self.websocket.closed
+                and time.monotonic() - self.opened_at < SESSION_MAX_AGE_SECONDS)
+
+    async def connect(self):
+        import ssl
+        import aiohttp
+        import certifi
+        from edge_tts.constants import SEC_MS_GEC_VERSION, WSS_HEADERS, WSS_URL
+        from edge_tts.drm import DRM
+
+        await self.close()
+        self.session = aiohttp.ClientSession(trust_env=True)
+        self.websocket = await self.session.ws_connect(
+            f"{WSS_URL}&ConnectionId={uuid.uuid4().hex}"
+            f"&Sec-MS-GEC={DRM.generate_sec_ms_gec()}"
+            f"&Sec-MS-GEC-Version={SEC_MS_GEC_VERSION}",
+            compress=15,
+            headers=DRM.headers_with_muid(WSS_HEADERS),
+            ssl=ssl.create_default_context(cafile=certifi.where()),
+        )
+        await self.websocket.send_str(
+            f"X-Timestamp:{date_to_string()}\r\n"
+            "Content-Type:application/json; charset=utf-8\r\n"
+            "Path:speech.config\r\n\r\n"
+            '{"context":{"synthesis":{"audio":{"metadataoptions":{'
+            '"sentenceBoundaryEnabled":"false","wordBoundaryEnabled":"false"},'
+            '"outputFormat":"audio-24khz-48kbitrate-mono-mp3"}}}}\r\n'
+        )
+        self.opened_at = time.monotonic()
+
+    async def synthesize(self, lines, break_ms: int) -> bytes:
+        """Synthesize lines in one SSML request, pausing break_ms between them"""
+        import aiohttp
+
+        if not self.usable:
+            await self.connect()
+
+        body = f"<break time='{break_ms}ms'/>".join(clean_text(line) for line in lines)
+        ssml = (
+            "<speak version='1.0' xmlns='http://www.w3.org/2001/10/synthesis' xml:lang='en-US'>"
+            f"<voice name='{self.voice}'>"
+            f"<prosody pitch='{self.settings['pitch']}' rate='{self.settings['rate']}' "
+            f"volume='{self.settings['volume']}'>{body}</prosody>"
+            "</voice></speak>"
+        )
+        await self.websocket.send_str(
+            f"X-RequestId:{uuid.uuid4().hex}\r\n"
+            "Content-Type:application/ssml+xml\r\n"
+            f"X-Timestamp:{date_to_string()}Z\r\n"
+            "Path:ssml\r\n\r\n"
+            f"{ssml}"
+        )
+
+        audio = []
+        async for message in self.websocket:
+            if message.type == aiohttp.WSMsgType.TEXT:
+                if "Path:turn.end" in message.data:
+                    break
+            elif message.type == aiohttp.WSMsgType.BINARY:
+                header_length = int.from_bytes(message.data[:2], "big")
+                headers = message.data[2:header_length + 2]
+                if b"Path:audio" in headers and b"Content-Type:audio/mpeg" in headers:
+                    audio.append(message.data[header_length + 2:])
+            else:
+                raise ConnectionError(f"Websocket closed mid-synthesis: {message.type}")
+        else:
+            raise ConnectionError("Websocket closed before turn.end")
+
+        if not audio:
+            raise ValueError("No audio received")
+        return b"".join(audio)
+
+    async def close(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+        if self.session is not None:
+            await self.session.close()
+        self.websocket = None
+        self.session = None
+
+
+class EdgeTTSPool:
+    """Up to size_per_voice warm sessions per voice, shared across requests"""
+
+    def __init__(self, size_per_voice: int, settings: dict, break_ms: int):
+        self.size_per_voice = size_per_voice
+        self.settings = settings
+        self.break_ms = break_ms
+        self.idle = {}      # voice -> idle sessions
+        self.slots = {}     # voice -> semaphore bounding sessions in use
+
+    async def synthesize(self, voice: str, lines) -> bytes:
+        """Synthesize lines on a pooled session, reconnecting once on failure"""
+        import aiohttp
+
+        slots = self.slots.setdefault(voice, asyncio.Semaphore(self.size_per_voice))
+        async with slots:
+            idle = self.idle.setdefault(voice, [])
+            session = idle.pop() if idle else EdgeTTSSession(voice, self.settings)
+            try:
+                try:
+                    audio = await asyncio.wait_for(
+                        session.synthesize(lines, self.break_ms), RECEIVE_TIMEOUT_SECONDS)
+                except (aiohttp.ClientError, ConnectionError):
+                    # A pooled connection may have gone stale; retry on a fresh one
+                    await session.connect()
+                    audio = await asyncio.wait_for(
+                        session.synthesize(lines, self.break_ms), RECEIVE_TIMEOUT_SECONDS)
+            except BaseException:
+                await session.close()
+                raise
+            idle.append(session)
+            return audio
+
+    def check(self):
+        """Why the pool can't run here, or None if it can"""
+        return check_edge_tts()
+
+    async def warm(self, voices):
+        """Open one idle session per voice, concurrently"""
+        async def open_session(voice):
+            session = EdgeTTSSession(voice, self.settings)
+            try:
+                await session.connect()
+            except BaseException:
+                await session.close()
+                raise
+            self.idle.setdefault(voice, []).append(session)
+
+        results = await asyncio.gather(*(open_session(voice) for voice in voices),
+                                       return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise errors[0]
+
+    async def close(self):
+        for sessions in self.idle.values():
+            for session in sessions:
+                await session.close()
+        self.idle.clear()